@@ -3,3 +3,17 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
 MONGODB_URI = "mongodb://localhost:27017"
 DATABASE_NAME = "kelime_mayinlari"
+MATCHMAKING_BACKEND = "memory"
+PUBSUB_BACKEND = "inprocess"
+PUBSUB_BROKER_HOST = "127.0.0.1"
+PUBSUB_BROKER_PORT = 8765
+BCRYPT_ROUNDS = 12
+PASSWORD_HASH_WORKERS = 4
+PASSWORD_HASH_QUEUE_LIMIT = 64
+LOG_LEVEL = "INFO"
+LOG_FORMAT = "text"  # "json": oyun kimliği ve aşama süreleriyle JSON satırları
+LOG_QUEUE_SIZE = 10000
+# Logger adı -> tutulacak DEBUG/INFO kayıt oranı (0-1); ör. {"game_router": 0.1, "game_utils": 0.05}
+LOG_SAMPLING = {}
+# Profil uç noktalarını (/admin/...) kullanabilen kullanıcılar
+ADMIN_USERNAMES = set()
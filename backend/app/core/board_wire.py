@@ -0,0 +1,39 @@
+from typing import Any, Dict, List, Optional
+
+from app.routers.game_utils import BOARD_SIZE, BOARD_LAYOUT_ID, BONUS_COORDS
+
+# 1: {"grid": 15x15 hücre} (eski istemciler). 2: sadece dolu hücreler, bonuslar yerleşim kimliğiyle.
+LEGACY_BOARD_FORMAT = 1
+SPARSE_BOARD_FORMAT = 2
+SPARSE_MEDIA_TYPE = "application/vnd.kelimemayinlari.board-v2+json"
+
+BOARD_LAYOUT = {
+    "id": BOARD_LAYOUT_ID,
+    "size": BOARD_SIZE,
+    "specials": {
+        bonus: sorted(r * BOARD_SIZE + c for r, c in coords)
+        for bonus, coords in BONUS_COORDS.items()
+    },
+}
+
+
+def negotiate_board_format(accept: Optional[str] = None, requested: Optional[int] = None) -> int:
+    if requested == SPARSE_BOARD_FORMAT or (accept and SPARSE_MEDIA_TYPE in accept):
+        return SPARSE_BOARD_FORMAT
+    return LEGACY_BOARD_FORMAT
+
+
+def sparse_board(board: Dict[str, Any]) -> Dict[str, Any]:
+    # Hücre: [satır * 15 + sütun, harf, orijinal taş]; orijinal taş jokerde "JOKER" olur.
+    cells: List[list] = []
+    grid = board.get("grid") or []
+    for r, row in enumerate(grid):
+        for c, cell in enumerate(row):
+            letter = cell.get("letter") if cell else None
+            if letter is not None:
+                cells.append([r * BOARD_SIZE + c, letter, cell.get("original_tile") or letter])
+    return {"v": SPARSE_BOARD_FORMAT, "layout": BOARD_LAYOUT_ID, "size": BOARD_SIZE, "cells": cells}
+
+
+def board_for_format(board: Dict[str, Any], board_format: int) -> Dict[str, Any]:
+    return sparse_board(board) if board_format == SPARSE_BOARD_FORMAT else board
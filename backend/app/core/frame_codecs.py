@@ -0,0 +1,103 @@
+import json
+import logging
+import time
+import zlib
+from typing import Callable, Dict, Optional, Union
+
+logger = logging.getLogger("frame_codecs")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+Frame = Union[str, bytes]
+
+DEFAULT_CODEC = "json"
+DEFLATE_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def _encode_json(text: str) -> Frame:
+    return text
+
+
+def _encode_msgpack(text: str) -> Frame:
+    return msgpack.packb(json.loads(text), use_bin_type=True)
+
+
+def _encode_deflate(text: str) -> Frame:
+    # Ham deflate (zlib başlıksız); istemci inflate ile açıp JSON olarak çözer.
+    compressor = zlib.compressobj(DEFLATE_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(text.encode()) + compressor.flush()
+
+
+_zstd_compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL) if zstandard else None
+
+
+def _encode_zstd(text: str) -> Frame:
+    return _zstd_compressor.compress(text.encode())
+
+
+CODECS: Dict[str, Callable[[str], Frame]] = {"json": _encode_json, "deflate": _encode_deflate}
+if msgpack is not None:
+    CODECS["msgpack"] = _encode_msgpack
+if zstandard is not None:
+    CODECS["zstd"] = _encode_zstd
+
+
+def negotiate(requested: Optional[str]) -> str:
+    if not requested:
+        return DEFAULT_CODEC
+    # İstemci tercih sırasıyla birden fazla kodlama önerebilir: "zstd,msgpack,json".
+    for name in requested.split(","):
+        name = name.strip().lower()
+        if name in CODECS:
+            return name
+    logger.info(f"Desteklenmeyen çerçeve kodlaması istendi: {requested}, {DEFAULT_CODEC} kullanılıyor.")
+    return DEFAULT_CODEC
+
+
+class CodecStats:
+    __slots__ = ("frames", "bytes", "encode_seconds")
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+        self.encode_seconds = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes,
+            "avg_bytes": round(self.bytes / self.frames) if self.frames else 0,
+            "avg_encode_us": round(self.encode_seconds / self.frames * 1e6, 1) if self.frames else 0,
+        }
+
+
+class FrameEncoder:
+    # Bir yayın için kodlanmış çerçeveleri tutar; her kodlama mesaj başına bir kez çalışır, soket başına değil.
+    __slots__ = ("text", "stats", "_frames")
+
+    def __init__(self, text: str, stats: Dict[str, CodecStats]):
+        self.text = text
+        self.stats = stats
+        self._frames: Dict[str, Frame] = {}
+
+    def get(self, codec: str) -> Frame:
+        frame = self._frames.get(codec)
+        if frame is None:
+            started = time.perf_counter()
+            frame = CODECS[codec](self.text)
+            elapsed = time.perf_counter() - started
+            stat = self.stats.setdefault(codec, CodecStats())
+            stat.frames += 1
+            stat.bytes += len(frame.encode()) if isinstance(frame, str) else len(frame)
+            stat.encode_seconds += elapsed
+            self._frames[codec] = frame
+        return frame
@@ -0,0 +1,498 @@
+import logging
+import random
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.routers.game_utils import (
+    LetterPool,
+    LETTER_SCORES,
+    deal_letters,
+    touches_existing_letter,
+    find_all_formed_words,
+    calculate_word_score,
+    apply_mine_and_reward_effects,
+    move_time_limit_seconds,
+    board_is_empty,
+)
+
+logger = logging.getLogger("game_engine")
+
+HAND_SIZE = 7
+BINGO_BONUS = 50
+# harf_yasagi ödülüyle rakibin elinden dondurulan harf sayısı
+FROZEN_LETTER_COUNT = 2
+
+
+class MoveError(Exception):
+    # Kural ihlali; HTTP katmanı status_code/detail ile HTTPException'a çevirir.
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+
+
+class MoveResult:
+    # state: hamle (ve varsa oyun sonu) uygulanmış yeni oyun belgesi; girdi belgesi değiştirilmez.
+    # updates/push: aynı değişikliğin Mongo karşılığı ($set/$push); her yazma version'ı bir artırır.
+    # Oyun sonu alanları (status, winner, bitiş skorları) updates'e girmez; istatistiklerle birlikte finish_game yazar.
+    __slots__ = (
+        "state", "updates", "push", "events", "notifications", "triggered_cells",
+        "status", "winner_key", "next_turn", "deadline", "score_gain",
+    )
+
+    def __init__(self):
+        self.state: Dict[str, Any] = {}
+        self.updates: Dict[str, Any] = {}
+        self.push: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self.notifications: List[str] = []
+        self.triggered_cells: List[Dict[str, Any]] = []
+        self.status = "active"
+        self.winner_key: Optional[str] = None
+        self.next_turn: Optional[str] = None
+        self.deadline: Optional[float] = None
+        self.score_gain = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status.startswith("finished")
+
+    def update_query(self) -> Dict[str, Any]:
+        query: Dict[str, Any] = {}
+        if self.updates:
+            query["$set"] = self.updates
+        if self.push:
+            query["$push"] = self.push
+        query["$inc"] = {"version": 1}
+        return query
+
+
+def get_player_keys(game: Dict, current_username: str) -> Tuple[Optional[str], Optional[str]]:
+    p1_user = game.get("player1_username")
+    p2_user = game.get("player2_username")
+    p1_key = game.get("player1_key", "player1")
+    p2_key = game.get("player2_key", "player2")
+
+    if current_username == p1_user:
+        return p1_key, p2_key
+    elif current_username == p2_user:
+        return p2_key, p1_key
+    else:
+        logger.warning(f"get_player_keys: Kullanıcı '{current_username}' oyunun parçası değil ({p1_user} vs {p2_user})")
+        return None, None
+
+
+def determine_winner_by_score(game: dict, scores_to_use: Optional[Dict] = None) -> Optional[str]:
+    scores = scores_to_use if scores_to_use is not None else game.get("scores", {})
+    p1_key = game.get("player1_key", "player1")
+    p2_key = game.get("player2_key", "player2")
+    p1s = scores.get(p1_key, 0)
+    p2s = scores.get(p2_key, 0)
+    if p1s > p2s: return p1_key
+    if p2s > p1s: return p2_key
+    return None
+
+
+def _username_for(game: Dict, player_key: str) -> Optional[str]:
+    return game.get("player1_username") if player_key == game.get("player1_key", "player1") else game.get("player2_username")
+
+
+def finish_updates(game: Dict, winner_player_key: Optional[str], status: str) -> Dict[str, Any]:
+    # Oyun sonu alanları: durum, kazanan ve (eli bitirme durumunda) kalan harf puanı aktarımı.
+    updates: Dict[str, Any] = {"status": status}
+    final_scores = game.get("scores", {}).copy()
+    p1_key = game.get("player1_key", "player1")
+    p2_key = game.get("player2_key", "player2")
+
+    if not winner_player_key:
+        winner_player_key = determine_winner_by_score(game, final_scores)
+    if winner_player_key:
+        updates["winner"] = _username_for(game, winner_player_key) or winner_player_key
+
+    if status == "finished_hand" and winner_player_key:
+        loser_player_key = p2_key if winner_player_key == p1_key else p1_key
+        loser_username = _username_for(game, loser_player_key)
+        loser_hand = game.get("hands", {}).get(loser_username, [])
+        remaining_points = sum(LETTER_SCORES.get(letter.upper(), 0) for letter in loser_hand)
+        if remaining_points > 0:
+            logger.info(f"Harf bitirme bonusu: {_username_for(game, winner_player_key)} +{remaining_points}, {loser_username} -{remaining_points}")
+            final_scores[winner_player_key] = final_scores.get(winner_player_key, 0) + remaining_points
+            final_scores[loser_player_key] = max(0, final_scores.get(loser_player_key, 0) - remaining_points)
+            updates["scores"] = final_scores
+            winner_by_final_score_key = determine_winner_by_score(game, final_scores)
+            updates["winner"] = (
+                (_username_for(game, winner_by_final_score_key) or winner_by_final_score_key)
+                if winner_by_final_score_key else None
+            )
+    return updates
+
+
+def apply_updates(state: Dict[str, Any], updates: Dict[str, Any], push: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    # Mongo $set (noktalı yollar) ve $push'un bellek içi karşılığı; sadece dokunulan alt sözlükler kopyalanır.
+    new_state = dict(state)
+    copied: Set[str] = set()
+    for path, value in updates.items():
+        parts = path.split(".")
+        target = new_state
+        for i, part in enumerate(parts[:-1]):
+            prefix = ".".join(parts[:i + 1])
+            if prefix not in copied:
+                child = target.get(part)
+                target[part] = dict(child) if isinstance(child, dict) else {}
+                copied.add(prefix)
+            target = target[part]
+        target[parts[-1]] = value
+    for key, op in (push or {}).items():
+        entries = op["$each"] if isinstance(op, dict) and "$each" in op else [op]
+        new_state[key] = list(state.get(key) or []) + list(entries)
+    return new_state
+
+
+def version_filter(game: Dict) -> Dict[str, Any]:
+    # Okunan sürüme koşullu yazma için filtre; version alanı olmayan eski belgelerde ilk yazma onu 1 yapar.
+    version = game.get("version")
+    return {"version": version} if version is not None else {"version": {"$exists": False}}
+
+
+def is_timed_out(game: Dict, now: float) -> bool:
+    last_move_time = game.get("lastMoveTime")
+    if not last_move_time:
+        return False
+    is_first_move = board_is_empty(game.get("board", {}).get("grid", []))
+    return now - last_move_time >= move_time_limit_seconds(game.get("timeOption", "5m"), is_first_move)
+
+
+def _is_blocked(game: Dict, player_key: str, col: int) -> bool:
+    is_player1 = player_key == game.get("player1_key", "player1")
+    region_block = game.get("region_block")
+    if region_block == "right" and not is_player1 and col >= 7: return True
+    if region_block == "left" and is_player1 and col < 7: return True
+    return False
+
+
+class GameEngine:
+    # Yan etkisiz kural motoru: (durum, hamle) -> MoveResult. Veritabanı, ağ ve saat erişimi yok;
+    # zaman (now) ve rastgelelik (rng) dışarıdan verilir, aynı girdiler aynı sonucu üretir.
+    def __init__(self, rng: random.Random = random):
+        self.rng = rng
+
+    def apply(self, game: Dict, username: str, move, now: float, timer=None) -> MoveResult:
+        status = game.get("status", "unknown")
+        if not status.startswith("active"):
+            raise MoveError(f"Oyun aktif değil (Durum: {status}). Hamle yapılamaz.")
+        player_key, opponent_key = get_player_keys(game, username)
+        if not player_key:
+            raise MoveError("Bu oyuna ait değilsiniz.", 403)
+        if game.get("turn") != username:
+            raise MoveError(f"Sıra sizde değil (Sıra: {game.get('turn')}).")
+
+        result = MoveResult()
+        grid = game.get("board", {}).get("grid", [])
+        is_first_move = board_is_empty(grid)
+        opponent_username = _username_for(game, opponent_key)
+        mine_reward_result: Dict = {}
+
+        if move.pass_move:
+            passes = game.get("consecutive_passes", 0) + 1
+            result.notifications.append(f"➡️ {username} pas geçti.")
+            result.updates["consecutive_passes"] = passes
+            result.updates["extra_move_in_progress"] = False
+            result.updates["extra_move_pending"] = False
+            result.events.append({"type": "pass", "player": username, "timestamp": now})
+            if passes >= 2:
+                logger.info(f"Oyun paslaşma ile bitti: {username} ikinci pas")
+                result.status = "finished_pass"
+                result.winner_key = determine_winner_by_score(game)
+
+        elif move.move_type == "shift_letter":
+            self._shift_letter(game, username, player_key, move, now, result)
+
+        elif move.move_type == "place_word":
+            mine_reward_result = self._place_word(game, username, player_key, opponent_key, move, now, is_first_move, result, timer)
+
+        else:
+            logger.error(f"Geçersiz hamle türü alındı: {move.move_type}")
+            raise MoveError("Geçersiz hamle türü.")
+
+        if game.get("extra_move_pending", False) and not move.pass_move:
+            # Ekstra hamle jokeri: bu hamleden sonra sıra oyuncuda kalır, bir sonraki hamlesi ekstra hamledir.
+            logger.info(f"{username} ekstra hamle jokerini kullandı. Sıra kendisinde kalıyor.")
+            result.updates["extra_move_pending"] = False
+            result.updates["extra_move_in_progress"] = True
+            result.next_turn, next_turn_key = username, player_key
+        elif game.get("extra_move_in_progress", False):
+            logger.info(f"{username} ekstra hamlesini kullandı. Sıra {opponent_username}'a geçiyor.")
+            result.updates["extra_move_in_progress"] = False
+            result.next_turn, next_turn_key = opponent_username, opponent_key
+            result.events.append({"type": "extra_move_used", "player": username, "timestamp": now})
+        elif mine_reward_result.get("extra_move_earned", False):
+            logger.info(f"{username} ekstra hamle hakkı kazandı! Sıra kendisinde kalıyor.")
+            result.notifications.append(f"✨ {username} ekstra hamle hakkı kazandı!")
+            result.updates["extra_move_in_progress"] = True
+            result.next_turn, next_turn_key = username, player_key
+        else:
+            result.updates["extra_move_in_progress"] = False
+            result.next_turn, next_turn_key = opponent_username, opponent_key
+
+        result.updates["turn"] = result.next_turn
+        result.updates["turn_key"] = next_turn_key
+        result.updates["lastMoveTime"] = now
+        next_is_first_move = is_first_move and bool(move.pass_move)
+        result.deadline = now + move_time_limit_seconds(game.get("timeOption", "5m"), next_is_first_move)
+        result.updates["deadline"] = result.deadline
+
+        if game.get("frozen_letters", {}).get(result.next_turn):
+            logger.info(f"Sırası gelen {result.next_turn} oyuncusunun donmuş harfleri temizlendi.")
+            result.updates.setdefault(f"frozen_letters.{result.next_turn}", [])
+
+        if result.events:
+            result.push["event_log"] = {"$each": result.events} if len(result.events) > 1 else result.events[0]
+
+        result.state = apply_updates(game, result.updates, result.push)
+        result.state["version"] = game.get("version", 0) + 1
+        if result.finished:
+            result.state = apply_updates(result.state, finish_updates(result.state, result.winner_key, result.status))
+        return result
+
+    def use_reward(self, game: Dict, username: str, reward_type: str, now: float) -> MoveResult:
+        # Ödül kullanmak sırayı değiştirmez; etki ve ödülün listeden düşmesi tek bir $set'tir.
+        status = game.get("status", "unknown")
+        if not status.startswith("active"):
+            raise MoveError(f"Oyun aktif değil (Durum: {status}).")
+        player_key, opponent_key = get_player_keys(game, username)
+        if not player_key:
+            raise MoveError("Bu oyuna ait değilsiniz.", 403)
+        if game.get("turn") != username:
+            raise MoveError(f"Sıra sizde değil (Sıra: {game.get('turn')}).")
+        rewards = game.get("allAvailableRewards", {}).get(player_key, [])
+        if reward_type not in rewards:
+            raise MoveError("Ödül elinizde yok.")
+
+        result = MoveResult()
+        opponent_username = _username_for(game, opponent_key)
+        if reward_type == "bolge_yasagi":
+            # Rakibin yarısı kapanır: player1 kullanırsa sağ, player2 kullanırsa sol.
+            result.updates["region_block"] = "right" if player_key == game.get("player1_key", "player1") else "left"
+        elif reward_type == "harf_yasagi":
+            opponent_hand = game.get("hands", {}).get(opponent_username, [])
+            frozen = game.get("frozen_letters", {}).get(opponent_username, [])
+            result.updates[f"frozen_letters.{opponent_username}"] = frozen + opponent_hand[:FROZEN_LETTER_COUNT]
+        elif reward_type == "ekstra_hamle_jokeri":
+            if game.get("extra_move_pending", False):
+                raise MoveError("Ekstra hamle jokeri zaten etkin.")
+            result.updates["extra_move_pending"] = True
+        else:
+            raise MoveError("Geçersiz ödül.")
+
+        remaining = rewards[:]
+        remaining.remove(reward_type)
+        result.updates[f"allAvailableRewards.{player_key}"] = remaining
+        result.notifications.append(f"🎁 {username} {reward_type.replace('_', ' ').title()} ödülünü kullandı.")
+        result.events.append({"type": "reward_used", "player": username, "reward_type": reward_type, "timestamp": now})
+        result.push["event_log"] = result.events[0]
+        result.next_turn = username
+
+        result.state = apply_updates(game, result.updates, result.push)
+        result.state["version"] = game.get("version", 0) + 1
+        return result
+
+    def _shift_letter(self, game: Dict, username: str, player_key: str, move, now: float, result: MoveResult):
+        grid = game.get("board", {}).get("grid", [])
+        if not move.positions or len(move.positions) != 2:
+            raise MoveError("Kaydırma için 2 pozisyon (kaynak, hedef) gereklidir.")
+        try:
+            from_r, from_c = move.positions[0]
+            to_r, to_c = move.positions[1]
+            if not (0 <= from_r < 15 and 0 <= from_c < 15 and 0 <= to_r < 15 and 0 <= to_c < 15):
+                raise MoveError("Kaydırma pozisyonları tahta dışında.")
+            original_cell = grid[from_r][from_c]
+            letter_to_move = original_cell.get("letter")
+            if letter_to_move is None:
+                raise MoveError(f"Başlangıç karesi [{from_r},{from_c}] boş.")
+            if grid[to_r][to_c].get("letter") is not None:
+                raise MoveError(f"Hedef kare [{to_r},{to_c}] dolu.")
+        except (ValueError, TypeError, IndexError) as e:
+            raise MoveError(f"Geçersiz kaydırma pozisyon formatı: {e}")
+
+        row_diff = abs(from_r - to_r); col_diff = abs(from_c - to_c)
+        if not ((row_diff <= 1 and col_diff <= 1) and (row_diff + col_diff > 0)):
+            raise MoveError("Harfler sadece 1 birim uzağa kaydırılabilir.")
+        if _is_blocked(game, player_key, to_c):
+            raise MoveError(f"Yasaklı bölgeye harf kaydırılamaz: [{to_r},{to_c}]")
+
+        board = [[cell.copy() for cell in row] for row in grid]
+        board[to_r][to_c] = {
+            "letter": letter_to_move,
+            "original_tile": original_cell.get("original_tile", letter_to_move),
+            "special": board[to_r][to_c].get("special")
+        }
+        board[from_r][from_c] = {
+            "letter": None,
+            "original_tile": None,
+            "special": original_cell.get("special")
+        }
+        result.updates["board.grid"] = board
+        result.updates["consecutive_passes"] = 0
+        result.updates["extra_move_in_progress"] = False
+        result.events.append({"type": "shift", "player": username, "from": [from_r, from_c], "to": [to_r, to_c], "timestamp": now})
+        result.notifications.append(f"↔️ {username} harf kaydırdı: [{from_r},{from_c}] -> [{to_r},{to_c}]")
+
+    def _place_word(
+        self, game: Dict, username: str, player_key: str, opponent_key: str, move, now: float,
+        is_first_move: bool, result: MoveResult, timer
+    ) -> Dict:
+        grid = game.get("board", {}).get("grid", [])
+        if not move.positions or not move.used_letters or len(move.positions) != len(move.used_letters):
+            raise MoveError("Pozisyon ve harf listeleri boş veya uzunlukları eşleşmiyor.")
+
+        my_hand = game.get("hands", {}).get(username, [])
+        remaining_hand = my_hand[:]
+        placed_letters_count: Dict[str, int] = {}
+        for letter in move.used_letters:
+            placed_letters_count[letter.upper()] = placed_letters_count.get(letter.upper(), 0) + 1
+        hand_letter_count: Dict[str, int] = {}
+        for letter in my_hand:
+            hand_letter_count[letter.upper()] = hand_letter_count.get(letter.upper(), 0) + 1
+        for letter, count in placed_letters_count.items():
+            if hand_letter_count.get(letter, 0) < count:
+                raise MoveError(f"Elinde yeterli '{letter}' harfi yok.")
+            for _ in range(count):
+                remaining_hand.remove(next(h for h in remaining_hand if h.upper() == letter))
+        frozen = game.get("frozen_letters", {}).get(username, [])
+        for letter in move.used_letters:
+            if letter.upper() in frozen:
+                raise MoveError(f"Donmuş harf ({letter}) kullanılamaz.")
+
+        board = [[cell.copy() for cell in row] for row in grid]
+        placed_tiles: List[Dict] = []
+        placed_coords: Set[Tuple[int, int]] = set()
+        joker_assignments = move.joker_assignments or {}
+        for i, pos in enumerate(move.positions):
+            try:
+                r, c = pos
+                if not (0 <= r < 15 and 0 <= c < 15): raise MoveError(f"Pozisyon tahta dışında: [{r},{c}]")
+                if board[r][c].get("letter") is not None: raise MoveError(f"Dolu kare: [{r},{c}]")
+                if _is_blocked(game, player_key, c): raise MoveError(f"Yasaklı bölgeye harf konulamaz: [{r},{c}]")
+                original_tile = move.used_letters[i].upper()
+                is_joker = original_tile == "JOKER"
+                assigned_letter = original_tile
+                if is_joker:
+                    assigned_char = joker_assignments.get(f"{r},{c}")
+                    if not assigned_char: raise MoveError(f"Joker [{r},{c}] için harf atanmamış.")
+                    assigned_letter = assigned_char.upper()
+                    if len(assigned_letter) != 1 or assigned_letter not in LETTER_SCORES or assigned_letter == "JOKER":
+                        raise MoveError(f"Joker için geçersiz harf ataması: '{assigned_letter}' [{r},{c}]")
+                board[r][c]["letter"] = assigned_letter
+                board[r][c]["original_tile"] = original_tile
+                placed_coords.add((r, c))
+                placed_tiles.append({"letter": assigned_letter, "original_tile": original_tile, "row": r, "col": c, "is_joker": is_joker})
+            except (ValueError, TypeError, IndexError) as e:
+                logger.warning(f"Move - Pozisyon/Harf işleme hatası: Hata: {e} - Pos: {pos}")
+                raise MoveError(f"Geçersiz pozisyon veya harf formatı: {pos}")
+
+        if not is_first_move:
+            if not touches_existing_letter(grid, move.positions, is_first_move):
+                raise MoveError("Harfler mevcut harflere bitişik olmalı.")
+        elif (7, 7) not in placed_coords:
+            raise MoveError("İlk hamle merkez kareyi (H8) içermelidir.")
+        if timer is not None:
+            timer.lap("validation")
+
+        try:
+            formed_words, are_all_valid, invalid_words = find_all_formed_words(board, move.positions, timer)
+        except Exception as e:
+            logger.error(f"Move - find_all_formed_words hatası: Hata: {e}", exc_info=True)
+            raise MoveError("Kelime bulma sırasında beklenmedik bir hata oluştu.", 500)
+
+        if not are_all_valid:
+            error_message = f"Geçersiz kelime(ler): {', '.join(invalid_words)}" if invalid_words else "Geçersiz hamle yapısı."
+            if invalid_words and isinstance(invalid_words[0], str) and len(invalid_words) == 1 and not formed_words:
+                error_message = invalid_words[0]
+            logger.warning("Geçersiz hamle: Kullanıcı %s, Mesaj: %s", username, error_message)
+            raise MoveError(error_message)
+
+        score_gain = 0
+        scored_words: List[str] = []
+        formed_word_strings: List[str] = []
+        if not formed_words:
+            if len(move.positions) == 1 and is_first_move:
+                result.notifications.append(f"📝 {username} ilk hamlesini yaptı (tek harf).")
+            else:
+                logger.error("Beklenmedik durum: Kelime yok ama `are_all_valid` True?")
+                raise MoveError("Kelime doğrulama sırasında tutarsızlık.", 500)
+        else:
+            for word_detail in formed_words:
+                word_str = word_detail["word"]
+                formed_word_strings.append(word_str)
+                word_score = calculate_word_score(board, word_detail["tiles"], placed_coords)
+                score_gain += word_score
+                scored_words.append(f"'{word_str}' ({word_score}p)")
+            if len(move.positions) == HAND_SIZE:
+                score_gain += BINGO_BONUS
+                result.notifications.append(f"✨ {username} Bingo yaptı! (+{BINGO_BONUS} puan)")
+            if scored_words:
+                result.notifications.append(f"📝 {username} kelime(ler) oluşturdu: {', '.join(scored_words)}")
+        if timer is not None:
+            timer.lap("scoring")
+
+        place_word_event = {
+            "type": "place_word",
+            "player": username,
+            "tiles": [{"letter": t["original_tile"], "assigned": t["letter"] if t["is_joker"] else None, "pos": [t["row"], t["col"]]} for t in placed_tiles],
+            "formed_words": formed_word_strings,
+            "score_before_mines": score_gain,
+            "timestamp": now
+        }
+        effects = apply_mine_and_reward_effects(
+            game_data=game,
+            placed_tiles_info=placed_tiles,
+            score_gain=score_gain,
+            player_key=player_key,
+            opponent_key=opponent_key,
+            now=now
+        )
+        if timer is not None:
+            timer.lap("mine_effects")
+
+        result.score_gain = effects.get("final_score", 0)
+        place_word_event["score_after_mines"] = result.score_gain
+        result.updates.update(effects.get("updates", {}))
+        result.notifications.extend(effects.get("notifications", []))
+        triggered_events = effects.get("triggered_events", [])
+        result.events.append(place_word_event)
+        result.events.extend(triggered_events)
+        for event in triggered_events:
+            event_pos = event.get("pos")
+            if event_pos and isinstance(event_pos, list) and len(event_pos) == 2:
+                row, col = event_pos
+                if event.get("type") == "mine_triggered":
+                    result.triggered_cells.append({"row": row, "col": col, "type": "mine"})
+                elif event.get("type") == "reward_earned":
+                    result.triggered_cells.append({"row": row, "col": col, "type": "reward"})
+
+        new_hand = remaining_hand
+        if effects.get("lose_letters", False):
+            logger.info(f"Harf kaybı mayını: {username} elindeki harfler sıfırlandı.")
+            new_hand = []
+        needed = HAND_SIZE - len(new_hand)
+        pool = LetterPool.load(game.get("pool"))
+        if needed > 0 and pool:
+            drawn = deal_letters(pool, needed, self.rng)
+            new_hand.extend(drawn)
+            logger.debug("%s %d harf çekti. Yeni el: %s", username, len(drawn), new_hand)
+            result.updates["pool"] = pool.to_counts()
+            result.updates["pool_remaining"] = pool.remaining
+        elif needed > 0:
+            logger.info(f"Havuz boş, {username} harf çekemedi.")
+
+        result.updates[f"hands.{username}"] = new_hand
+        result.updates["board.grid"] = board
+        result.updates["consecutive_passes"] = 0
+
+        if not new_hand:
+            logger.info(f"Oyuncu {username} elindeki harfleri bitirdi.")
+            result.status = "finished_hand"
+            result.winner_key = player_key
+        return effects
+
+
+engine = GameEngine()
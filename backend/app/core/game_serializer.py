@@ -0,0 +1,145 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+from starlette.responses import Response
+
+from app.routers.game_utils import LetterPool
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger("game_serializer")
+
+# Şemadaki alanlar: bunların değerleri zaten JSON uyumlu (str/int/float/None ve bunların
+# liste/dict'leri), kopyalanmadan aynen aktarılır. 225 hücrelik tahta da bunlara dahil.
+PASSTHROUGH_KEYS = frozenset({
+    "player1_username", "player2_username", "player1_key", "player2_key",
+    "board", "status", "turn", "turn_key", "timeOption", "consecutive_passes",
+    "extra_move_in_progress", "extra_move_pending", "region_block", "winner", "lastMoveTime", "deadline",
+    "version",
+})
+DATETIME_KEYS = frozenset({"gameStartTime"})
+# Bu alanlar aşağıda oyuncu anahtarlarına göre yeniden kurulur veya hiç gönderilmez.
+REBUILT_KEYS = frozenset({
+    "_id", "scores", "hands", "allAvailableRewards", "available_rewards", "frozen_letters",
+    "pool", "pool_remaining", "event_log", "time_left",
+    "internal_mines_on_board", "internal_rewards_on_board", "timeout_claimed",
+})
+
+_EMPTY_GRID_CELL = {"letter": None, "special": None, "original_tile": None}
+
+
+def _convert(item: Any) -> Any:
+    # Şemada olmayan alanlar için genel dönüşüm (eski serialize_game_data davranışı).
+    if isinstance(item, list):
+        return [_convert(i) for i in item]
+    if isinstance(item, dict):
+        return {str(k): _convert(v) for k, v in item.items() if not (isinstance(k, str) and k.startswith("internal_"))}
+    if isinstance(item, ObjectId):
+        return str(item)
+    if isinstance(item, datetime):
+        return item.isoformat()
+    if hasattr(item, "model_dump"):
+        return item.model_dump()
+    return item
+
+
+def serialize_game(game_data: Dict[str, Any]) -> Dict[str, Any]:
+    if not game_data:
+        logger.warning("serialize_game'e boş veri geldi.")
+        return {}
+
+    is_finished = game_data.get("status", "").startswith("finished")
+    p1_key = game_data.get("player1_key", "player1")
+    p2_key = game_data.get("player2_key", "player2")
+    p1_user = game_data.get("player1_username")
+    p2_user = game_data.get("player2_username")
+
+    serialized: Dict[str, Any] = {}
+    if "_id" in game_data:
+        serialized["game_id"] = str(game_data["_id"])
+    for key, value in game_data.items():
+        if key in PASSTHROUGH_KEYS:
+            serialized[key] = value
+        elif key in DATETIME_KEYS:
+            serialized[key] = value.isoformat() if isinstance(value, datetime) else value
+        elif key not in REBUILT_KEYS:
+            serialized[key] = _convert(value)
+
+    serialized.setdefault("player1_username", None)
+    serialized.setdefault("player2_username", None)
+
+    scores = game_data.get("scores", {})
+    serialized["scores"] = {p1_key: scores.get(p1_key, 0), p2_key: scores.get(p2_key, 0)}
+
+    hands = game_data.get("hands", {})
+    serialized["hands"] = {p1_user: hands.get(p1_user, []), p2_user: hands.get(p2_user, [])} if p1_user and p2_user else {}
+
+    rewards = game_data.get("allAvailableRewards", {})
+    serialized["allAvailableRewards"] = {p1_key: rewards.get(p1_key, []), p2_key: rewards.get(p2_key, [])}
+
+    frozen = game_data.get("frozen_letters", {})
+    serialized["frozen_letters"] = {p1_user: frozen.get(p1_user, []), p2_user: frozen.get(p2_user, [])} if p1_user and p2_user else {}
+
+    letter_pool = LetterPool.load(game_data.get("pool"))
+    serialized["pool"] = letter_pool.to_letters()
+    serialized["pool_remaining"] = letter_pool.remaining
+
+    serialized.setdefault("status", "unknown")
+    serialized.setdefault("turn", None)
+    serialized.setdefault("extra_move_in_progress", False)
+    serialized.setdefault("extra_move_pending", False)
+    serialized.setdefault("region_block", None)
+    serialized.setdefault("winner", None)
+    serialized.setdefault("timeOption", "0")
+    serialized.setdefault("lastMoveTime", None)
+    serialized.setdefault("gameStartTime", None)
+    serialized.setdefault("turn_key", None)
+    serialized.setdefault("version", 0)
+    serialized.setdefault("player1_key", p1_key)
+    serialized.setdefault("player2_key", p2_key)
+
+    board_data = serialized.get("board")
+    if isinstance(board_data, list):
+        serialized["board"] = {"grid": board_data}
+    elif not (isinstance(board_data, dict) and "grid" in board_data):
+        serialized["board"] = {"grid": [[dict(_EMPTY_GRID_CELL) for _ in range(15)] for _ in range(15)]}
+        logger.warning(f"Oyun {serialized.get('game_id')} için DB'de geçerli tahta bulunamadı, boş tahta oluşturuldu.")
+
+    if is_finished:
+        serialized["event_log"] = _convert(game_data.get("event_log", []))
+    return serialized
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    raise TypeError(f"JSON'a çevrilemeyen tip: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+class GameJSONResponse(Response):
+    # response_model doğrulamasını ve jsonable_encoder turunu atlayıp doğrudan bayt üretir.
+    # content RPC gibi dict bekleyen çağıranlar için saklanır.
+    media_type = "application/json"
+
+    def __init__(self, content: Any, status_code: int = 200, **kwargs):
+        self.content = content
+        super().__init__(content, status_code=status_code, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
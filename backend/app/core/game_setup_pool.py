@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, Optional
+
+from app.core.stats import percentile, to_ms
+from app.models.game import GameCreate
+from app.routers.game_utils import (
+    generate_letter_pool,
+    deal_letters,
+    assign_solid_bonuses,
+    assign_mines_and_rewards,
+    FIRST_MOVE_TIME_LIMIT_SECONDS,
+)
+
+logger = logging.getLogger("game_setup_pool")
+
+_P1_PLACEHOLDER = "__player1__"
+_P2_PLACEHOLDER = "__player2__"
+
+
+def build_game_setup() -> Dict[str, Any]:
+    pool = generate_letter_pool()
+    hand1 = deal_letters(pool, 7)
+    hand2 = deal_letters(pool, 7)
+
+    board_grid = [[{"letter": None, "special": None, "original_tile": None} for _ in range(15)] for _ in range(15)]
+    assign_solid_bonuses(board_grid)
+    mines_map, rewards_map = assign_mines_and_rewards(board_grid)
+
+    turn_player_key = random.choice(['player1', 'player2'])
+
+    # Model oyuncular belli olmadan bir kez doğrulanır; eşleşmede sadece isimler yerleştirilir.
+    game_data = GameCreate(
+        player1_username=_P1_PLACEHOLDER,
+        player2_username=_P2_PLACEHOLDER,
+        board={"grid": board_grid},
+        hands={_P1_PLACEHOLDER: hand1, _P2_PLACEHOLDER: hand2},
+        pool=pool.to_counts(),
+        pool_remaining=pool.remaining,
+        status="active",
+        turn_key=turn_player_key,
+        player1_key="player1",
+        player2_key="player2",
+        scores={"player1": 0, "player2": 0},
+        consecutive_passes=0,
+        internal_mines_on_board=mines_map,
+        internal_rewards_on_board=rewards_map,
+        allAvailableRewards={"player1": [], "player2": []},
+        event_log=[]
+    )
+    return game_data.model_dump(by_alias=True, exclude_none=True)
+
+
+def stamp_players(setup: Dict[str, Any], player1_username: str, player2_username: str, time_option_str: str) -> Dict[str, Any]:
+    hands = setup["hands"]
+    setup["player1_username"] = player1_username
+    setup["player2_username"] = player2_username
+    setup["hands"] = {player1_username: hands[_P1_PLACEHOLDER], player2_username: hands[_P2_PLACEHOLDER]}
+    setup["frozen_letters"] = {player1_username: [], player2_username: []}
+    setup["turn"] = player1_username if setup.get("turn_key") == "player1" else player2_username
+    setup["timeOption"] = time_option_str
+    setup["gameStartTime"] = datetime.utcnow()
+    setup["lastMoveTime"] = time.time()
+    setup["deadline"] = setup["lastMoveTime"] + FIRST_MOVE_TIME_LIMIT_SECONDS
+    return setup
+
+
+class GameSetupPool:
+    def __init__(self, capacity: int = 32, sample_size: int = 512):
+        self.capacity = capacity
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._refill = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._match_times: Deque[float] = deque(maxlen=sample_size)
+        self.hits = 0
+        self.misses = 0
+        self.produced = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._produce())
+            logger.info(f"Oyun kurulum havuzu başlatıldı (kapasite {self.capacity}).")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _produce(self):
+        while True:
+            while len(self._buffer) < self.capacity:
+                try:
+                    self._buffer.append(build_game_setup())
+                    self.produced += 1
+                except Exception as e:
+                    logger.error(f"Oyun kurulumu üretilemedi: {e}", exc_info=True)
+                    await asyncio.sleep(1)
+                # Her kurulumdan sonra döngüyü bırak ki istekler beklemesin.
+                await asyncio.sleep(0)
+            self._refill.clear()
+            await self._refill.wait()
+
+    def take(self) -> Dict[str, Any]:
+        try:
+            setup = self._buffer.popleft()
+            self.hits += 1
+        except IndexError:
+            setup = build_game_setup()
+            self.misses += 1
+        self._refill.set()
+        return setup
+
+    def record_match_time(self, seconds: float):
+        self._match_times.append(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = list(self._match_times)
+        return {
+            "depth": self.depth,
+            "capacity": self.capacity,
+            "produced": self.produced,
+            "hits": self.hits,
+            "misses": self.misses,
+            "time_to_match_ms": {
+                "count": len(samples),
+                "p50": to_ms(percentile(samples, 50)),
+                "p95": to_ms(percentile(samples, 95)),
+                "max": to_ms(max(samples) if samples else None),
+            },
+        }
+
+
+setup_pool = GameSetupPool()
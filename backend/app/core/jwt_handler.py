@@ -1,15 +1,100 @@
+import hashlib
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
 from jose import jwt, JWTError
 from app.config import JWT_SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
+TOKEN_CACHE_SIZE = 4096
+
+# Doğrulanmış token'lar özetleriyle tutulur; aynı token her istekte yeniden HMAC/JSON çözümünden geçmez.
+_token_cache: "OrderedDict[bytes, Tuple[dict, float]]" = OrderedDict()
+_revoked_tokens: Dict[bytes, float] = {}
+_revoked_subjects: Dict[str, float] = {}
+cache_hits = 0
+cache_misses = 0
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # iat saniyenin altında hassas tutulur; revoke_subject aynı saniyede üretilen yeni token'ı ayırt edebilsin.
+    to_encode.update({"exp": expire, "iat": time.time()})
     return jwt.encode(to_encode, JWT_SECRET_KEY, algorithm=ALGORITHM)
 
-def verify_token(token: str):
+def _digest(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=20).digest()
+
+def _issued_at(payload: dict) -> float:
+    # Eski token'larda iat yok; süre bitiminden geriye hesaplanır.
+    return payload.get("iat") or payload["exp"] - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+def _is_revoked(key: bytes, payload: dict) -> bool:
+    if key in _revoked_tokens:
+        return True
+    revoked_at = _revoked_subjects.get(payload.get("sub"))
+    return revoked_at is not None and _issued_at(payload) <= revoked_at
+
+def verify_token(token: str) -> Optional[dict]:
+    global cache_hits, cache_misses
+    key = _digest(token)
+    now = time.time()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        payload, exp = cached
+        if exp > now:
+            _token_cache.move_to_end(key)
+            cache_hits += 1
+            return payload
+        del _token_cache[key]
+        return None
+
+    cache_misses += 1
     try:
-        return jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[ALGORITHM])
     except JWTError:
         return None
+    if _is_revoked(key, payload):
+        return None
+    exp = payload.get("exp")
+    if exp is not None:
+        _token_cache[key] = (payload, float(exp))
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return payload
+
+def revoke_token(token: str):
+    # Çıkış vb. için: token süresi dolana kadar reddedilir.
+    key = _digest(token)
+    cached = _token_cache.pop(key, None)
+    try:
+        exp = cached[1] if cached else jwt.get_unverified_claims(token).get("exp", time.time())
+    except JWTError:
+        return
+    _revoked_tokens[key] = float(exp)
+    _purge_revoked()
+
+def revoke_subject(username: str):
+    # Şifre değişimi vb. için: kullanıcının şu ana kadar üretilmiş tüm token'ları geçersiz olur.
+    _revoked_subjects[username] = time.time()
+    for key in [k for k, (payload, _) in _token_cache.items() if payload.get("sub") == username]:
+        del _token_cache[key]
+    _purge_revoked()
+
+def _purge_revoked():
+    now = time.time()
+    for key in [k for k, exp in _revoked_tokens.items() if exp <= now]:
+        del _revoked_tokens[key]
+    horizon = now - ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    for username in [u for u, at in _revoked_subjects.items() if at <= horizon]:
+        del _revoked_subjects[username]
+
+def token_cache_stats() -> dict:
+    return {
+        "size": len(_token_cache),
+        "capacity": TOKEN_CACHE_SIZE,
+        "hits": cache_hits,
+        "misses": cache_misses,
+        "revoked_tokens": len(_revoked_tokens),
+        "revoked_subjects": len(_revoked_subjects),
+    }
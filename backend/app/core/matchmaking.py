@@ -0,0 +1,573 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import MATCHMAKING_BACKEND
+from app.core.rating import DEFAULT_RATING, match_quality
+from app.core.stats import percentile, to_ms
+
+logger = logging.getLogger("matchmaking")
+
+TIME_OPTIONS = ("2m", "5m", "12h", "24h")
+
+QUEUED = "queued"
+ALREADY_QUEUED = "already_queued"
+QUEUED_ELSEWHERE = "queued_elsewhere"
+MATCHED = "matched"
+
+RATING_BUCKET_SIZE = 50
+BASE_RATING_WINDOW = 100
+RATING_WINDOW_STEP = 50
+RATING_WINDOW_INTERVAL_SECONDS = 5.0
+MAX_RATING_WINDOW = 800
+SWEEP_INTERVAL_SECONDS = 2.0
+MEMBER_LEASE_SECONDS = 30.0
+
+
+def rating_window(waited_seconds: float) -> float:
+    steps = int(max(0.0, waited_seconds) // RATING_WINDOW_INTERVAL_SECONDS)
+    return min(MAX_RATING_WINDOW, BASE_RATING_WINDOW + steps * RATING_WINDOW_STEP)
+
+
+def rating_bucket(rating: float) -> int:
+    return int(rating // RATING_BUCKET_SIZE)
+
+
+def candidate_buckets(bucket: int, keys: List[int]) -> List[int]:
+    # Sıralı kova listesinde bisect ile sadece en geniş pencereye düşen kovalar alınır,
+    # yakından uzağa sıralanır; kova sayısı pencereyle sınırlı olduğundan tarama sabit maliyetli.
+    span = MAX_RATING_WINDOW // RATING_BUCKET_SIZE + 1
+    lo = bisect.bisect_left(keys, bucket - span)
+    hi = bisect.bisect_right(keys, bucket + span)
+    return sorted(keys[lo:hi], key=lambda k: (abs(k - bucket), k))
+
+
+class QueueTicket:
+    __slots__ = ("username", "time_option", "rating", "enqueued_at", "seq", "active")
+
+    def __init__(self, username: str, time_option: str, rating: float = DEFAULT_RATING, seq: int = 0, enqueued_at: Optional[float] = None):
+        self.username = username
+        self.time_option = time_option
+        self.rating = rating
+        self.enqueued_at = enqueued_at if enqueued_at is not None else time.time()
+        self.seq = seq
+        self.active = True
+
+    @property
+    def bucket(self) -> int:
+        return rating_bucket(self.rating)
+
+    def accepts(self, other: "QueueTicket", now: float) -> bool:
+        window = max(rating_window(now - self.enqueued_at), rating_window(now - other.enqueued_at))
+        return abs(self.rating - other.rating) <= window
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "QueueTicket":
+        return cls(doc["username"], doc["time_option"], doc.get("rating", DEFAULT_RATING), enqueued_at=doc.get("enqueued_at"))
+
+    def to_doc(self) -> Dict[str, Any]:
+        return {"username": self.username, "time_option": self.time_option, "rating": self.rating, "enqueued_at": self.enqueued_at}
+
+    def to_dict(self) -> Dict[str, Any]:
+        waited = time.time() - self.enqueued_at
+        return {
+            "username": self.username,
+            "time_option": self.time_option,
+            "rating": self.rating,
+            "enqueued_at": self.enqueued_at,
+            "waited_seconds": round(waited, 3),
+            "rating_window": rating_window(waited),
+        }
+
+
+MatchHandler = Callable[[QueueTicket, QueueTicket], Awaitable[None]]
+
+
+class MatchMetrics:
+    def __init__(self, time_options: Tuple[str, ...], sample_size: int):
+        self._waits: Dict[str, Deque[Tuple[int, float]]] = {opt: deque(maxlen=sample_size) for opt in time_options}
+        self._qualities: Dict[str, Deque[float]] = {opt: deque(maxlen=sample_size) for opt in time_options}
+        self._gaps: Dict[str, Deque[float]] = {opt: deque(maxlen=sample_size) for opt in time_options}
+        self.matches = 0
+        self.cancels = 0
+
+    def record(self, waiting: QueueTicket, arriving: QueueTicket, now: float):
+        opt = waiting.time_option
+        self._waits[opt].append((waiting.bucket, now - waiting.enqueued_at))
+        self._qualities[opt].append(match_quality(waiting.rating, arriving.rating))
+        self._gaps[opt].append(abs(waiting.rating - arriving.rating))
+        self.matches += 1
+
+    def expected_wait(self, time_option: str, rating: float) -> Optional[float]:
+        samples = self._waits.get(time_option)
+        if not samples:
+            return None
+        bucket = rating_bucket(rating)
+        nearby = [w for b, w in samples if abs(b - bucket) <= 2]
+        return percentile(nearby or [w for _, w in samples], 50)
+
+    def option_stats(self, opt: str) -> Dict[str, Any]:
+        waits = [w for _, w in self._waits[opt]]
+        qualities = list(self._qualities[opt])
+        gaps = list(self._gaps[opt])
+        return {
+            "matched_wait_ms": {
+                "count": len(waits),
+                "p50": to_ms(percentile(waits, 50)),
+                "p90": to_ms(percentile(waits, 90)),
+                "p99": to_ms(percentile(waits, 99)),
+            },
+            "match_quality": {
+                "mean": round(sum(qualities) / len(qualities), 4) if qualities else None,
+                "p10": percentile(qualities, 10),
+            },
+            "rating_gap": {
+                "p50": percentile(gaps, 50),
+                "p90": percentile(gaps, 90),
+            },
+        }
+
+
+class MatchmakingBackend(ABC):
+    def __init__(self, time_options: Tuple[str, ...] = TIME_OPTIONS, sample_size: int = 1024):
+        self._time_options = time_options
+        self.metrics = MatchMetrics(time_options, sample_size)
+        self._sweeper: Optional[asyncio.Task] = None
+
+    @abstractmethod
+    async def enqueue(self, username: str, time_option: str, rating: float = DEFAULT_RATING) -> Tuple[str, Optional[QueueTicket]]:
+        pass
+
+    @abstractmethod
+    async def requeue(self, ticket: QueueTicket):
+        pass
+
+    @abstractmethod
+    async def cancel(self, username: str) -> Optional[QueueTicket]:
+        pass
+
+    @abstractmethod
+    async def ticket_for(self, username: str) -> Optional[QueueTicket]:
+        pass
+
+    @abstractmethod
+    async def pair_waiting(self) -> List[Tuple[QueueTicket, QueueTicket]]:
+        pass
+
+    @abstractmethod
+    async def stats(self) -> Dict[str, Any]:
+        pass
+
+    def expected_wait(self, time_option: str, rating: float) -> Optional[float]:
+        return self.metrics.expected_wait(time_option, rating)
+
+    def start_sweeper(self, on_match: MatchHandler, interval: float = SWEEP_INTERVAL_SECONDS):
+        # Bekleyenlerin pencereleri zamanla genişler; yeni biri gelmese de uygun çiftler eşleştirilir.
+        async def sweep():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    pairs = await self.pair_waiting()
+                except Exception as e:
+                    logger.error(f"Bekleyenler eşleştirilemedi: {e}", exc_info=True)
+                    continue
+                for waiting, other in pairs:
+                    try:
+                        await on_match(waiting, other)
+                    except Exception as e:
+                        logger.error(f"Arka plan eşleşmesi başlatılamadı: {waiting.username} vs {other.username}, Hata: {e}", exc_info=True)
+
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(sweep())
+
+    async def stop_sweeper(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    def _validate_option(self, time_option: str):
+        if time_option not in self._time_options:
+            raise ValueError(f"Geçersiz süre seçeneği: {time_option}")
+
+
+class InMemoryMatchmakingBackend(MatchmakingBackend):
+    def __init__(self, time_options: Tuple[str, ...] = TIME_OPTIONS, sample_size: int = 1024):
+        super().__init__(time_options, sample_size)
+        self._lock = asyncio.Lock()
+        self._buckets: Dict[str, Dict[int, Deque[QueueTicket]]] = {opt: {} for opt in time_options}
+        self._bucket_live: Dict[str, Dict[int, int]] = {opt: {} for opt in time_options}
+        self._bucket_keys: Dict[str, List[int]] = {opt: [] for opt in time_options}
+        self._depths: Dict[str, int] = {opt: 0 for opt in time_options}
+        self._tickets: Dict[str, QueueTicket] = {}
+        self._seq = itertools.count()
+
+    async def ticket_for(self, username: str) -> Optional[QueueTicket]:
+        return self._tickets.get(username)
+
+    def _head(self, time_option: str, bucket: int, skip: Optional[QueueTicket] = None) -> Optional[QueueTicket]:
+        # İptal edilen biletler kuyruktan hemen silinmez, başa geldiklerinde atlanır.
+        queue = self._buckets[time_option].get(bucket)
+        while queue and not queue[0].active:
+            queue.popleft()
+        if not queue:
+            return None
+        if queue[0] is not skip:
+            return queue[0]
+        # Bilet kendi kovasının başındaysa (ör. requeue ile öne eklendiyse) arkasındaki ilk etkin bilete bakılır.
+        return next((t for t in itertools.islice(queue, 1, None) if t.active and t is not skip), None)
+
+    def _add(self, ticket: QueueTicket, front: bool = False):
+        opt, bucket = ticket.time_option, ticket.bucket
+        ticket.active = True
+        self._tickets[ticket.username] = ticket
+        queue = self._buckets[opt].setdefault(bucket, deque())
+        if front:
+            queue.appendleft(ticket)
+        else:
+            queue.append(ticket)
+        live = self._bucket_live[opt].get(bucket, 0)
+        if live == 0:
+            bisect.insort(self._bucket_keys[opt], bucket)
+        self._bucket_live[opt][bucket] = live + 1
+        self._depths[opt] += 1
+
+    def _remove(self, ticket: QueueTicket):
+        opt, bucket = ticket.time_option, ticket.bucket
+        ticket.active = False
+        self._tickets.pop(ticket.username, None)
+        self._depths[opt] -= 1
+        live = self._bucket_live[opt][bucket] - 1
+        if live == 0:
+            del self._bucket_live[opt][bucket]
+            self._buckets[opt].pop(bucket, None)
+            keys = self._bucket_keys[opt]
+            keys.pop(bisect.bisect_left(keys, bucket))
+        else:
+            self._bucket_live[opt][bucket] = live
+
+    def _find_partner(self, ticket: QueueTicket, now: float) -> Optional[QueueTicket]:
+        for bucket in candidate_buckets(ticket.bucket, self._bucket_keys[ticket.time_option]):
+            head = self._head(ticket.time_option, bucket, skip=ticket)
+            if head is not None and head.accepts(ticket, now):
+                return head
+        return None
+
+    async def enqueue(self, username: str, time_option: str, rating: float = DEFAULT_RATING) -> Tuple[str, Optional[QueueTicket]]:
+        self._validate_option(time_option)
+        async with self._lock:
+            existing = self._tickets.get(username)
+            if existing:
+                if existing.time_option == time_option:
+                    return ALREADY_QUEUED, existing
+                return QUEUED_ELSEWHERE, existing
+
+            ticket = QueueTicket(username, time_option, rating, next(self._seq))
+            now = time.time()
+            opponent = self._find_partner(ticket, now)
+            if opponent is None:
+                self._add(ticket)
+                logger.info(f"{username} sıraya girdi: {time_option} (puan {rating})")
+                return QUEUED, None
+
+            self._remove(opponent)
+            self.metrics.record(opponent, ticket, now)
+            logger.info(f"Rakip bulundu: {username} ({rating}) vs {opponent.username} ({opponent.rating}) ({time_option})")
+            return MATCHED, opponent
+
+    async def pair_waiting(self) -> List[Tuple[QueueTicket, QueueTicket]]:
+        pairs = []
+        async with self._lock:
+            now = time.time()
+            for opt in self._time_options:
+                heads = [self._head(opt, b) for b in list(self._bucket_keys[opt])]
+                for ticket in sorted((h for h in heads if h), key=lambda t: t.enqueued_at):
+                    if not ticket.active:
+                        continue
+                    partner = self._find_partner(ticket, now)
+                    if partner is None:
+                        continue
+                    self._remove(ticket)
+                    self._remove(partner)
+                    older, newer = (ticket, partner) if ticket.enqueued_at <= partner.enqueued_at else (partner, ticket)
+                    self.metrics.record(older, newer, now)
+                    pairs.append((older, newer))
+        return pairs
+
+    async def requeue(self, ticket: QueueTicket):
+        async with self._lock:
+            if ticket.username not in self._tickets:
+                self._add(ticket, front=True)
+
+    async def cancel(self, username: str) -> Optional[QueueTicket]:
+        async with self._lock:
+            ticket = self._tickets.get(username)
+            if not ticket:
+                return None
+            self._remove(ticket)
+            self.metrics.cancels += 1
+            logger.info(f"{username} sıradan çıktı: {ticket.time_option}")
+            return ticket
+
+    async def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        per_option = {}
+        for opt in self._time_options:
+            heads = [self._head(opt, b) for b in self._bucket_keys[opt]]
+            oldest = min((h.enqueued_at for h in heads if h), default=None)
+            per_option[opt] = {
+                "depth": self._depths[opt],
+                "rating_buckets": len(self._bucket_keys[opt]),
+                "oldest_wait_seconds": round(now - oldest, 3) if oldest else None,
+                **self.metrics.option_stats(opt),
+            }
+        return {
+            "backend": "memory",
+            "total_waiting": len(self._tickets),
+            "matches": self.metrics.matches,
+            "cancels": self.metrics.cancels,
+            "time_options": per_option,
+        }
+
+
+class MongoMatchmakingBackend(MatchmakingBackend):
+    # Her (süre seçeneği, puan kovası) için tek belge: {_id: "5m:24", time_option, bucket, tickets: [...]}.
+    # Rakip, baştaki bilet değişmediyse koşullu find_one_and_update($pop) ile atomik alınır;
+    # böylece farklı worker'lardaki oyuncular da eşleşir. Kullanıcı başına tek bilet, bilet kovaya
+    # girmeden önce members koleksiyonuna _id=kullanıcı adı ile eklenen üyelik belgesiyle sağlanır.
+    def __init__(self, collection, members, time_options: Tuple[str, ...] = TIME_OPTIONS, sample_size: int = 1024, max_attempts: int = 16):
+        super().__init__(time_options, sample_size)
+        self._collection = collection
+        self._members = members
+        self._max_attempts = max_attempts
+
+    @staticmethod
+    def _doc_id(time_option: str, bucket: int) -> str:
+        return f"{time_option}:{bucket}"
+
+    async def ticket_for(self, username: str) -> Optional[QueueTicket]:
+        doc = await self._collection.find_one(
+            {"tickets.username": username},
+            projection={"tickets": {"$elemMatch": {"username": username}}}
+        )
+        if not doc or not doc.get("tickets"):
+            return None
+        return QueueTicket.from_doc(doc["tickets"][0])
+
+    async def _insert_member(self, ticket: QueueTicket) -> bool:
+        try:
+            await self._members.insert_one({"_id": ticket.username, **ticket.to_doc(), "claimed_at": time.time()})
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def _claim_member(self, ticket: QueueTicket) -> Optional[QueueTicket]:
+        # Üyelik alınırsa None, kullanıcı zaten sıradaysa mevcut bileti döner.
+        member = None
+        for _ in range(self._max_attempts):
+            if await self._insert_member(ticket):
+                return None
+            member = await self._members.find_one({"_id": ticket.username})
+            if member is None:
+                continue
+            existing = await self.ticket_for(ticket.username)
+            if existing:
+                return existing
+            if time.time() - member["claimed_at"] < MEMBER_LEASE_SECONDS:
+                return QueueTicket.from_doc(member)
+            # Bileti kovada olmayan eski üyelik: sıraya girerken yarıda kalmış bir istekten kalmış.
+            logger.warning(f"{ticket.username} için süresi dolmuş kuyruk üyeliği siliniyor.")
+            await self._members.delete_one({"_id": ticket.username, "claimed_at": member["claimed_at"]})
+        if member is None:
+            raise RuntimeError(f"{ticket.username} için kuyruk üyeliği alınamadı.")
+        return QueueTicket.from_doc(member)
+
+    async def _release_member(self, ticket: QueueTicket):
+        # Kullanıcı bu arada yeniden sıraya girdiyse yeni üyeliği silinmez.
+        await self._members.delete_one({"_id": ticket.username, "enqueued_at": ticket.enqueued_at})
+
+    async def _heads(self, time_option: str, depth: int = 1) -> Dict[int, List[QueueTicket]]:
+        heads = {}
+        cursor = self._collection.find(
+            {"time_option": time_option, "tickets.0": {"$exists": True}},
+            projection={"bucket": 1, "tickets": {"$slice": depth}}
+        )
+        async for doc in cursor:
+            heads[doc["bucket"]] = [QueueTicket.from_doc(t) for t in doc["tickets"]]
+        return heads
+
+    async def _claim_head(self, head: QueueTicket) -> bool:
+        claimed = await self._collection.find_one_and_update(
+            {"_id": self._doc_id(head.time_option, head.bucket), "tickets.0.username": head.username},
+            {"$pop": {"tickets": -1}},
+            projection={"_id": 1}
+        )
+        return claimed is not None
+
+    async def _push(self, ticket: QueueTicket, front: bool = False):
+        entry = {"$each": [ticket.to_doc()], "$position": 0} if front else ticket.to_doc()
+        try:
+            await self._collection.update_one(
+                {"_id": self._doc_id(ticket.time_option, ticket.bucket), "tickets.username": {"$ne": ticket.username}},
+                {"$push": {"tickets": entry}, "$setOnInsert": {"time_option": ticket.time_option, "bucket": ticket.bucket}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Bilet zaten kovada: filtre eşleşmedi ve upsert aynı _id ile çakıştı.
+            pass
+
+    async def enqueue(self, username: str, time_option: str, rating: float = DEFAULT_RATING) -> Tuple[str, Optional[QueueTicket]]:
+        self._validate_option(time_option)
+
+        ticket = QueueTicket(username, time_option, rating)
+        existing = await self._claim_member(ticket)
+        if existing:
+            if existing.time_option == time_option:
+                return ALREADY_QUEUED, existing
+            return QUEUED_ELSEWHERE, existing
+
+        for _ in range(self._max_attempts):
+            now = time.time()
+            heads = {b: tickets[0] for b, tickets in (await self._heads(time_option)).items()}
+            keys = sorted(heads)
+            opponent = next(
+                (heads[b] for b in candidate_buckets(ticket.bucket, keys)
+                 if heads[b].username != username and heads[b].accepts(ticket, now)),
+                None
+            )
+            if opponent is None:
+                break
+            if await self._claim_head(opponent):
+                await self._release_member(opponent)
+                await self._release_member(ticket)
+                self.metrics.record(opponent, ticket, now)
+                logger.info(f"Rakip bulundu: {username} ({rating}) vs {opponent.username} ({opponent.rating}) ({time_option})")
+                return MATCHED, opponent
+
+        # Eşzamanlı gelen uygun iki oyuncu da sıraya girerse arka plan taraması onları eşleştirir.
+        await self._push(ticket)
+        logger.info(f"{username} sıraya girdi: {time_option} (puan {rating})")
+        return QUEUED, None
+
+    async def _claim_pair(self, first: QueueTicket, second: QueueTicket) -> bool:
+        if not await self._claim_head(first):
+            return False
+        if not await self._claim_head(second):
+            await self._push(first, front=True)
+            return False
+        return True
+
+    async def pair_waiting(self) -> List[Tuple[QueueTicket, QueueTicket]]:
+        pairs = []
+        for opt in self._time_options:
+            bucket_heads = await self._heads(opt, depth=2)
+            used = set()
+            now = time.time()
+
+            # Aynı kovaya eşzamanlı düşen biletler (yalnızca yarışta oluşur) baştan ikişer alınır.
+            for tickets in bucket_heads.values():
+                if len(tickets) == 2 and tickets[0].accepts(tickets[1], now):
+                    first, second = tickets
+                    used.update((first.username, second.username))
+                    if await self._claim_pair(first, second):
+                        await self._release_member(first)
+                        await self._release_member(second)
+                        self.metrics.record(first, second, now)
+                        pairs.append((first, second))
+
+            heads = {b: tickets[0] for b, tickets in bucket_heads.items() if tickets[0].username not in used}
+            keys = sorted(heads)
+            for ticket in sorted(heads.values(), key=lambda t: t.enqueued_at):
+                if ticket.username in used:
+                    continue
+                partner = next(
+                    (heads[b] for b in candidate_buckets(ticket.bucket, keys)
+                     if heads[b].username not in used and heads[b].username != ticket.username and heads[b].accepts(ticket, now)),
+                    None
+                )
+                if partner is None:
+                    continue
+                used.update((ticket.username, partner.username))
+                if await self._claim_pair(ticket, partner):
+                    await self._release_member(ticket)
+                    await self._release_member(partner)
+                    self.metrics.record(ticket, partner, now)
+                    pairs.append((ticket, partner))
+        return pairs
+
+    async def requeue(self, ticket: QueueTicket):
+        if not await self._insert_member(ticket):
+            # Kullanıcı bu arada yeniden sıraya girmiş; eski bilet geri konmaz.
+            return
+        await self._push(ticket, front=True)
+
+    async def cancel(self, username: str) -> Optional[QueueTicket]:
+        ticket = await self.ticket_for(username)
+        if not ticket:
+            return None
+        result = await self._collection.update_one(
+            {"_id": self._doc_id(ticket.time_option, ticket.bucket)},
+            {"$pull": {"tickets": {"username": username}}}
+        )
+        if result.modified_count == 0:
+            return None
+        await self._release_member(ticket)
+        self.metrics.cancels += 1
+        logger.info(f"{username} sıradan çıktı: {ticket.time_option}")
+        return ticket
+
+    async def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        depths: Dict[str, int] = {opt: 0 for opt in self._time_options}
+        buckets: Dict[str, int] = {opt: 0 for opt in self._time_options}
+        oldest: Dict[str, Optional[float]] = {opt: None for opt in self._time_options}
+        pipeline = [
+            {"$match": {"tickets.0": {"$exists": True}}},
+            {"$project": {"time_option": 1, "depth": {"$size": "$tickets"}, "head": {"$arrayElemAt": ["$tickets.enqueued_at", 0]}}},
+        ]
+        async for doc in self._collection.aggregate(pipeline):
+            opt = doc.get("time_option")
+            if opt not in depths:
+                continue
+            depths[opt] += doc["depth"]
+            buckets[opt] += 1
+            if oldest[opt] is None or doc["head"] < oldest[opt]:
+                oldest[opt] = doc["head"]
+        per_option = {
+            opt: {
+                "depth": depths[opt],
+                "rating_buckets": buckets[opt],
+                "oldest_wait_seconds": round(now - oldest[opt], 3) if oldest[opt] else None,
+                **self.metrics.option_stats(opt),
+            }
+            for opt in self._time_options
+        }
+        return {
+            "backend": "mongo",
+            "total_waiting": sum(depths.values()),
+            "matches": self.metrics.matches,
+            "cancels": self.metrics.cancels,
+            "time_options": per_option,
+        }
+
+
+def create_matchmaker(kind: str) -> MatchmakingBackend:
+    if kind == "mongo":
+        from app.db.database import db
+        return MongoMatchmakingBackend(db.matchmaking_queue, db.queue_members)
+    if kind != "memory":
+        logger.warning(f"Bilinmeyen eşleştirme altyapısı '{kind}', bellek içi kullanılıyor.")
+    return InMemoryMatchmakingBackend()
+
+
+matchmaker = create_matchmaker(MATCHMAKING_BACKEND)
@@ -0,0 +1,153 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# Prometheus metin biçiminde (0.0.4) basit sayaç/histogram kaydı. İstemci kütüphanesi yerine
+# tek süreçlik, kilitsiz sayımlar: olay döngüsü tek iş parçacıklı, gözlem birkaç yüz nanosaniye.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+PHASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, labels: LabelValues = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Gauge:
+    # Değer kazıma anında okunur (bağlantı sayısı gibi zaten tutulan durumlar için).
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 read: Callable[[], Iterable[Tuple[LabelValues, float]]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._read = read
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in self._read():
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = PHASE_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Etiket başına: [kova sayıları (birikimsiz, son eleman +Inf), toplam]
+        self._series: Dict[LabelValues, list] = {}
+
+    def observe(self, labels: LabelValues, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class PhaseTimer:
+    # Ardışık aşamalar için: lap() bir önceki işaretten bu yana geçen süreyi verilen aşamaya yazar.
+    # phases (ms) aynı isteğin yapılandırılmış log satırına eklenir.
+    __slots__ = ("_histogram", "_endpoint", "_last", "phases")
+
+    def __init__(self, histogram: Histogram, endpoint: str):
+        self._histogram = histogram
+        self._endpoint = endpoint
+        self._last = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def lap(self, phase: str):
+        now = time.perf_counter()
+        elapsed = now - self._last
+        self._histogram.observe((self._endpoint, phase), elapsed)
+        self.phases[phase] = round(elapsed * 1000, 3)
+        self._last = now
+
+    def skip(self):
+        # Ölçülmeyecek bir aralığı (ör. başka bir aşamaya ait olmayan bekleme) atlar.
+        self._last = time.perf_counter()
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+move_phase_seconds = registry.register(Histogram(
+    "kelime_move_phase_seconds", "Hamle hattı aşama süreleri (saniye)", ("endpoint", "phase")
+))
+moves_total = registry.register(Counter("kelime_moves_total", "İşlenen hamleler, türe göre", ("type",)))
+invalid_moves_total = registry.register(Counter(
+    "kelime_invalid_moves_total", "Reddedilen hamleler (4xx), uç noktaya göre", ("endpoint",)
+))
+mines_triggered_total = registry.register(Counter(
+    "kelime_mines_triggered_total", "Tetiklenen mayınlar, türe göre", ("mine_type",)
+))
+
+
+def phase_timer(endpoint: str) -> PhaseTimer:
+    return PhaseTimer(move_phase_seconds, endpoint)
+
+
+def register_gauge(name: str, documentation: str, labelnames: Tuple[str, ...],
+                   read: Callable[[], Iterable[Tuple[LabelValues, float]]]) -> Gauge:
+    return registry.register(Gauge(name, documentation, labelnames, read))
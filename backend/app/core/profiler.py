@@ -0,0 +1,244 @@
+import asyncio
+import cProfile
+import io
+import logging
+import marshal
+import os
+import pstats
+import signal
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Optional, Tuple
+
+from app.config import ADMIN_USERNAMES
+from app.core.jwt_handler import verify_token
+
+logger = logging.getLogger("profiler")
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+# Başlıkla tek istek profillemesi sadece bu yollar için (hamle hattı).
+PROFILED_PATH_PREFIXES = ("/game/move/",)
+MAX_ARTIFACTS = 16
+MAX_STACK_DEPTH = 64
+
+Artifact = Tuple[str, bytes]
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class StackSampler:
+    # Olay döngüsü iş parçacığının yığınını ayrı bir iş parçacığından aralıklarla okur.
+    # Döngüye hiç kod eklemez; maliyet örnekleme aralığıyla sınırlı (varsayılan 5ms).
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+
+def collapsed(samples: Counter) -> bytes:
+    # flamegraph.pl / speedscope'un okuduğu "a;b;c adet" biçimi.
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common()).encode()
+
+
+def pstats_artifact(profile: cProfile.Profile, fmt: str) -> Artifact:
+    stats = pstats.Stats(profile)
+    if fmt == "text":
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(80)
+        return "text/plain; charset=utf-8", stream.getvalue().encode()
+    # pstats.Stats(dosya) ile açılabilen ham dump (snakeviz, gprof2dot).
+    return "application/octet-stream", marshal.dumps(stats.stats)
+
+
+def is_admin_token(authorization: Optional[str]) -> bool:
+    if not authorization or not authorization.startswith("Bearer "):
+        return False
+    payload = verify_token(authorization.split("Bearer ")[1])
+    return bool(payload) and payload.get("sub") in ADMIN_USERNAMES
+
+
+class Profiler:
+    # Aynı anda tek oturum: cProfile iş parçacığı başına tek profil kancası kullanır.
+    def __init__(self):
+        self.active: Optional[str] = None
+        self.requests_seen = 0
+        self._request_target: Optional[Tuple[int, asyncio.Event]] = None
+        self.artifacts: "OrderedDict[str, Artifact]" = OrderedDict()
+
+    def _claim(self, kind: str):
+        if self.active is not None:
+            raise ProfilerBusy(self.active)
+        self.active = kind
+
+    def request_finished(self):
+        self.requests_seen += 1
+        target = self._request_target
+        if target and self.requests_seen >= target[0]:
+            target[1].set()
+
+    async def _wait(self, seconds: float, requests: Optional[int]):
+        # N saniye ya da (verildiyse) N istek tamamlanana kadar; hangisi önce olursa.
+        if not requests:
+            await asyncio.sleep(seconds)
+            return
+        done = asyncio.Event()
+        self._request_target = (self.requests_seen + requests, done)
+        try:
+            await asyncio.wait_for(done.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._request_target = None
+
+    async def sample(self, seconds: float, requests: Optional[int], interval: float) -> Artifact:
+        self._claim("sample")
+        sampler = StackSampler(threading.get_ident(), interval)
+        sampler.start()
+        try:
+            await self._wait(seconds, requests)
+        finally:
+            samples = sampler.stop()
+            self.active = None
+        return "text/plain; charset=utf-8", collapsed(samples)
+
+    async def cprofile(self, seconds: float, requests: Optional[int], fmt: str) -> Artifact:
+        self._claim("cprofile")
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await self._wait(seconds, requests)
+        finally:
+            profile.disable()
+            self.active = None
+        return pstats_artifact(profile, fmt)
+
+    def store(self, artifact: Artifact) -> str:
+        artifact_id = uuid.uuid4().hex[:12]
+        self.artifacts[artifact_id] = artifact
+        while len(self.artifacts) > MAX_ARTIFACTS:
+            self.artifacts.popitem(last=False)
+        return artifact_id
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "requests_seen": self.requests_seen,
+            "artifacts": list(self.artifacts.keys()),
+        }
+
+    def install_signal_handler(self, seconds: float = 10.0, interval: float = 0.005):
+        # SIGUSR1: çalışan worker'da N saniye örnekleme; sonuç geçici dizine .folded olarak yazılır.
+        if not hasattr(signal, "SIGUSR1"):
+            return
+        loop = asyncio.get_running_loop()
+
+        async def run():
+            try:
+                _, body = await self.sample(seconds, None, interval)
+            except ProfilerBusy:
+                logger.warning("Profil sinyali yok sayıldı: başka bir profil oturumu çalışıyor.")
+                return
+            path = os.path.join(tempfile.gettempdir(), f"kelime-profile-{os.getpid()}-{int(time.time())}.folded")
+            with open(path, "wb") as f:
+                f.write(body)
+            logger.info(f"Profil yazıldı: {path}")
+
+        try:
+            loop.add_signal_handler(signal.SIGUSR1, lambda: asyncio.ensure_future(run()))
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning(f"Profil sinyali kurulamadı: {e}")
+
+
+profiler = Profiler()
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class ProfilingMiddleware:
+    # Saf ASGI: biten istekleri sayar; yönetici "X-Profile: 1" gönderirse tek hamle isteğini
+    # cProfile ile baştan sona (yayın dahil) profiller ve yanıta X-Profile-Id ekler.
+    # Profil kancası iş parçacığı başına olduğundan aynı anda döngüde çalışan diğer işler de görünür.
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        try:
+            if self._wants_profile(scope):
+                await self._profiled(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+        finally:
+            profiler.request_finished()
+
+    @staticmethod
+    def _wants_profile(scope) -> bool:
+        if not scope["path"].startswith(PROFILED_PATH_PREFIXES) or not _header(scope, PROFILE_HEADER):
+            return False
+        return profiler.active is None and is_admin_token(_header(scope, b"authorization"))
+
+    async def _profiled(self, scope, receive, send):
+        profiler.active = "request"
+        profile = cProfile.Profile()
+        fmt = "text" if _header(scope, PROFILE_HEADER) == "text" else "pstats"
+
+        def finish() -> Optional[str]:
+            if profiler.active != "request":
+                return None
+            profile.disable()
+            profiler.active = None
+            return profiler.store(pstats_artifact(profile, fmt))
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                # Yanıt başlamadan profil kapatılır; kimlik başlıkla döner, yapıt hemen alınabilir.
+                artifact_id = finish()
+                if artifact_id:
+                    message = dict(message, headers=list(message.get("headers", [])) + [(PROFILE_ID_HEADER, artifact_id.encode())])
+            await send(message)
+
+        profile.enable()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            finish()
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import logging
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger("pubsub")
+
+# (tür, hedef, metin, sıra): tür "room"/"state" ise hedef oda id'si, "user" ise kullanıcı adıdır.
+# Sıra numarası oda mesajlarında yeniden bağlanma tamponu için taşınır, diğerlerinde 0'dır.
+BusHandler = Callable[[str, str, str, int], Awaitable[None]]
+
+
+class PubSubBus(ABC):
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handler: Optional[BusHandler] = None
+        self.published = 0
+        self.received = 0
+
+    async def start(self, handler: BusHandler):
+        self._handler = handler
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, kind: str, target: str, text: str, seq: int = 0):
+        pass
+
+    async def _dispatch(self, kind: str, target: str, text: str, seq: int = 0):
+        self.received += 1
+        if self._handler is None:
+            return
+        try:
+            await self._handler(kind, target, text, seq)
+        except Exception as e:
+            logger.error(f"Yayın mesajı işlenemedi ({kind}:{target}): {e}", exc_info=True)
+
+
+class InProcessBus(PubSubBus):
+    # Aynı süreçteki birden fazla ConnectionManager'ı birbirine bağlar (tek worker veya testler).
+    def __init__(self, hub: Optional[List["InProcessBus"]] = None):
+        super().__init__()
+        self._hub = hub if hub is not None else []
+
+    def attach(self) -> "InProcessBus":
+        return InProcessBus(self._hub)
+
+    async def start(self, handler: BusHandler):
+        await super().start(handler)
+        if self not in self._hub:
+            self._hub.append(self)
+
+    async def stop(self):
+        if self in self._hub:
+            self._hub.remove(self)
+
+    async def publish(self, kind: str, target: str, text: str, seq: int = 0):
+        self.published += 1
+        for peer in list(self._hub):
+            if peer is not self:
+                await peer._dispatch(kind, target, text, seq)
+
+
+class BrokerBus(PubSubBus):
+    # pubsub_broker.py'deki satır tabanlı TCP aracısına bağlanır; gerçek bir Redis/NATS yerine geçer.
+    def __init__(self, host: str, port: int, reconnect_delay: float = 1.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.reconnect_delay = reconnect_delay
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+
+    async def start(self, handler: BusHandler):
+        await super().start(handler)
+        if self._reader_task is None or self._reader_task.done():
+            self._reader_task = asyncio.create_task(self._run())
+        try:
+            await asyncio.wait_for(self._connected.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            logger.warning(f"Yayın aracısına bağlanılamadı: {self.host}:{self.port}, arka planda denenecek.")
+
+    async def stop(self):
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+    async def _run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                logger.warning(f"Yayın aracısı bağlantı hatası: {e}")
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            self._connected.set()
+            logger.info(f"Yayın aracısına bağlanıldı: {self.host}:{self.port} (worker {self.worker_id})")
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    envelope = json.loads(line)
+                    await self._dispatch(envelope["k"], envelope["t"], envelope["d"], envelope.get("s", 0))
+            except (ConnectionError, ValueError) as e:
+                logger.warning(f"Yayın aracısı bağlantısı koptu: {e}")
+            finally:
+                self._connected.clear()
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def publish(self, kind: str, target: str, text: str, seq: int = 0):
+        writer = self._writer
+        if writer is None:
+            logger.warning(f"Yayın aracısı bağlı değil, mesaj sadece yerel teslim edildi: {kind}:{target}")
+            return
+        writer.write(json.dumps({"k": kind, "t": target, "d": text, "s": seq}, ensure_ascii=False).encode() + b"\n")
+        self.published += 1
+        try:
+            await writer.drain()
+        except ConnectionError as e:
+            logger.warning(f"Yayın aracısına yazılamadı: {e}")
+
+
+def create_bus(kind: str, host: str, port: int) -> PubSubBus:
+    if kind == "broker":
+        return BrokerBus(host, port)
+    if kind != "inprocess":
+        logger.warning(f"Bilinmeyen yayın altyapısı '{kind}', süreç içi kullanılıyor.")
+    return InProcessBus()
@@ -0,0 +1,58 @@
+import argparse
+import asyncio
+import logging
+from typing import Set
+
+logger = logging.getLogger("pubsub_broker")
+
+# Geliştirme/test için basit yayın aracısı: her worker'dan gelen satırı diğer tüm worker'lara iletir.
+
+
+class Broker:
+    def __init__(self):
+        self.clients: Set[asyncio.StreamWriter] = set()
+        self.relayed = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.clients.add(writer)
+        peer = writer.get_extra_info("peername")
+        logger.info(f"Worker bağlandı: {peer} ({len(self.clients)} bağlantı)")
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for client in list(self.clients):
+                    if client is writer:
+                        continue
+                    try:
+                        client.write(line)
+                    except ConnectionError:
+                        self.clients.discard(client)
+                self.relayed += 1
+                await asyncio.gather(*(c.drain() for c in list(self.clients) if c is not writer), return_exceptions=True)
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+            logger.info(f"Worker ayrıldı: {peer} ({len(self.clients)} bağlantı)")
+
+
+async def serve(host: str, port: int, ready: asyncio.Event = None):
+    broker = Broker()
+    server = await asyncio.start_server(broker.handle, host, port)
+    logger.info(f"Yayın aracısı dinliyor: {host}:{port}")
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    from app.config import PUBSUB_BROKER_HOST, PUBSUB_BROKER_PORT
+
+    parser = argparse.ArgumentParser(description="Worker'lar arası WebSocket yayın aracısı")
+    parser.add_argument("--host", default=PUBSUB_BROKER_HOST)
+    parser.add_argument("--port", type=int, default=PUBSUB_BROKER_PORT)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    asyncio.run(serve(args.host, args.port))
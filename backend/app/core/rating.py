@@ -0,0 +1,35 @@
+from typing import Optional, Tuple
+
+DEFAULT_RATING = 1200.0
+K_FACTOR = 32.0
+PROVISIONAL_GAMES = 10
+PROVISIONAL_K_FACTOR = 48.0
+
+
+def expected_score(rating_a: float, rating_b: float) -> float:
+    return 1.0 / (1.0 + 10 ** ((rating_b - rating_a) / 400.0))
+
+
+def match_quality(rating_a: float, rating_b: float) -> float:
+    # 1.0: eşit güçte rakipler, 0.0: sonucu kesin belli eşleşme.
+    return 1.0 - abs(0.5 - expected_score(rating_a, rating_b)) * 2.0
+
+
+def k_factor(total_games: int) -> float:
+    return PROVISIONAL_K_FACTOR if total_games < PROVISIONAL_GAMES else K_FACTOR
+
+
+def updated_ratings(
+    rating_a: float, rating_b: float, score_a: float,
+    games_a: int = PROVISIONAL_GAMES, games_b: int = PROVISIONAL_GAMES
+) -> Tuple[float, float]:
+    exp_a = expected_score(rating_a, rating_b)
+    new_a = rating_a + k_factor(games_a) * (score_a - exp_a)
+    new_b = rating_b + k_factor(games_b) * ((1.0 - score_a) - (1.0 - exp_a))
+    return round(new_a, 1), round(new_b, 1)
+
+
+def score_for(username: str, winner_username: Optional[str]) -> float:
+    if not winner_username:
+        return 0.5
+    return 1.0 if winner_username == username else 0.0
@@ -1,9 +1,95 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Deque, Dict, Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT
+from app.core.stats import percentile, to_ms
+
+# min/max turları varsayılana sabitlenir: maliyet değişince eski hash'ler needs_update olur
+# ve girişte yeni maliyetle yeniden üretilir.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+class HashingSaturated(Exception):
+    pass
+
+class PasswordHasher:
+    # bcrypt GIL'i bırakır; iş parçacığı havuzunda çalışınca olay döngüsü (yayınlar, hamleler) donmaz.
+    def __init__(self, workers: int, queue_limit: int, sample_size: int = 512):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._wait_times: Deque[float] = deque(maxlen=sample_size)
+        self._run_times: Deque[float] = deque(maxlen=sample_size)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    async def _run(self, fn, *args):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+        if self.waiting >= self.queue_limit:
+            # Kuyruk doluysa beklemek yerine hemen reddedilir; istemci Retry-After ile tekrar dener.
+            self.rejected += 1
+            raise HashingSaturated()
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self._wait_times.append(started - queued_at)
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self._run_times.append(time.perf_counter() - started)
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        # Geçerliyse ve hash eski maliyetteyse ikinci değer yeni hash'tir; çağıran kaydeder.
+        valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed)
+        if valid and new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> Dict:
+        waits = list(self._wait_times)
+        runs = list(self._run_times)
+        return {
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+            "waiting": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "wait_ms": {"p50": to_ms(percentile(waits, 50)), "p99": to_ms(percentile(waits, 99))},
+            "hash_ms": {"p50": to_ms(percentile(runs, 50)), "p99": to_ms(percentile(runs, 99))},
+        }
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_LIMIT)
@@ -0,0 +1,89 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.board_wire import LEGACY_BOARD_FORMAT, board_for_format
+from app.core.game_serializer import dumps
+
+# Oyuncuya özel alanlar; diğer alıcılara hiç gönderilmez.
+PRIVATE_KEYS = ("hands", "frozen_letters")
+# Torbadaki harfler rakibin elini ele verir; yayında sadece pool_remaining kalır.
+HIDDEN_KEYS = ("pool",)
+
+_STATE_UPDATE_PREFIX = '{{"type":"state_update","seq":{seq},"payload":'
+
+
+def _dumps(value: Any) -> str:
+    return dumps(value).decode()
+
+
+class StateProjection:
+    # Ortak kısım (tahta, skorlar, sıra, torba boyutu, ödüller) bir kez serileştirilir;
+    # her alıcıya sadece kendi eli ve donmuş harfleri küçük bir ek olarak eklenir.
+    # Tahta, istemcinin istediği biçimde (eski/seyrek) biçim başına bir kez serileştirilir.
+    __slots__ = ("seq", "players", "hands", "frozen_letters", "board", "_shared", "_boards", "_frames")
+
+    def __init__(self, serialized_game: Dict[str, Any], seq: int = 0):
+        shared = {
+            k: v for k, v in serialized_game.items()
+            if k not in PRIVATE_KEYS and k not in HIDDEN_KEYS and k != "board"
+        }
+        self.players = (serialized_game.get("player1_username"), serialized_game.get("player2_username"))
+        self.hands = serialized_game.get("hands") or {}
+        self.frozen_letters = serialized_game.get("frozen_letters") or {}
+        self.board = serialized_game.get("board")
+        self.seq = seq
+        # Kapanış süslü parantezi atılır; tahta ve alıcıya özel alanlar sonuna eklenir.
+        self._shared = _dumps(shared)[:-1]
+        self._boards: Dict[int, str] = {}
+        self._frames: Dict[Tuple[Optional[str], int], str] = {}
+
+    def viewer_key(self, username: Optional[str]) -> Optional[str]:
+        # İzleyicilerin hepsi aynı (elsiz) çerçeveyi paylaşır.
+        return username if username and username in self.players else None
+
+    def _board_text(self, board_format: int) -> str:
+        text = self._boards.get(board_format)
+        if text is None:
+            text = self._boards[board_format] = _dumps(board_for_format(self.board, board_format))
+        return text
+
+    def message_for(self, username: Optional[str], board_format: int = LEGACY_BOARD_FORMAT) -> str:
+        key = self.viewer_key(username)
+        frame = self._frames.get((key, board_format))
+        if frame is None:
+            if key is None:
+                overlay = ',"hands":{},"frozen_letters":{}}}'
+            else:
+                overlay = (
+                    f',"hands":{_dumps({key: self.hands.get(key, [])})}'
+                    f',"frozen_letters":{_dumps({key: self.frozen_letters.get(key, [])})}}}}}'
+                )
+            board = f',"board":{self._board_text(board_format)}' if self.board is not None else ""
+            frame = _STATE_UPDATE_PREFIX.format(seq=self.seq) + self._shared + board + overlay
+            self._frames[(key, board_format)] = frame
+        return frame
+
+    def to_wire(self) -> str:
+        # Diğer worker'lara gönderilen biçim: ortak kısım metin olarak, tahta ve özel kısımlar ayrı.
+        return _dumps({
+            "seq": self.seq,
+            "shared": self._shared + "}",
+            "board": self.board,
+            "hands": self.hands,
+            "frozen_letters": self.frozen_letters,
+            "players": self.players,
+        })
+
+    @classmethod
+    def from_wire(cls, text: str) -> "StateProjection":
+        data = json.loads(text)
+        projection = cls.__new__(cls)
+        projection.seq = data.get("seq", 0)
+        projection.players = tuple(data["players"])
+        projection.hands = data["hands"]
+        projection.frozen_letters = data["frozen_letters"]
+        projection.board = data.get("board")
+        projection._shared = data["shared"][:-1]
+        projection._boards = {}
+        projection._frames = {}
+        return projection
@@ -0,0 +1,119 @@
+import asyncio
+import heapq
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger("timeout_scheduler")
+
+ExpireHandler = Callable[[str], Awaitable[Optional[float]]]
+DeadlineLoader = Callable[[], Awaitable[Iterable[Tuple[str, float]]]]
+
+
+class TimeoutScheduler:
+    def __init__(self, resync_interval: float = 60.0):
+        self.resync_interval = resync_interval
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._on_expire: Optional[ExpireHandler] = None
+        self._loader: Optional[DeadlineLoader] = None
+        self._last_resync = 0.0
+        self.expired_count = 0
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, game_id: str, deadline: float):
+        # Eski kayıtlar heap'te kalır; _deadlines ile eşleşmeyenler atlanır.
+        self._deadlines[game_id] = deadline
+        heapq.heappush(self._heap, (deadline, game_id))
+        if self._heap[0] == (deadline, game_id):
+            self._wakeup.set()
+
+    def cancel(self, game_id: str):
+        self._deadlines.pop(game_id, None)
+
+    def start(self, on_expire: ExpireHandler, loader: DeadlineLoader):
+        self._on_expire = on_expire
+        self._loader = loader
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("Zaman aşımı zamanlayıcısı başlatıldı.")
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def rebuild(self):
+        if not self._loader:
+            return
+        known = dict(self._deadlines)
+        loaded = dict(await self._loader())
+        # Yükleme beklenirken schedule() ile eklenen veya ileri alınan kayıtlar korunur; oyun başına
+        # geç olan süre kalır. Önceden bilinip artık aktif olmayan (başka worker'da biten) oyunlar atılır.
+        for game_id, deadline in list(self._deadlines.items()):
+            if game_id not in loaded and known.get(game_id) == deadline:
+                del self._deadlines[game_id]
+        for game_id, deadline in loaded.items():
+            current = self._deadlines.get(game_id)
+            if current is None or deadline > current:
+                self._deadlines[game_id] = deadline
+        self._heap = [(deadline, game_id) for game_id, deadline in self._deadlines.items()]
+        heapq.heapify(self._heap)
+        self._last_resync = time.time()
+        logger.info(f"Zaman aşımı zamanlayıcısı yeniden kuruldu: {len(self._deadlines)} aktif oyun.")
+
+    def _pop_due(self, now: float) -> List[str]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, game_id = heapq.heappop(self._heap)
+            if self._deadlines.get(game_id) == deadline:
+                del self._deadlines[game_id]
+                due.append(game_id)
+        return due
+
+    async def _run(self):
+        try:
+            await self.rebuild()
+        except Exception as e:
+            logger.error(f"Zaman aşımı zamanlayıcısı kurulamadı: {e}", exc_info=True)
+
+        while True:
+            now = time.time()
+            if now - self._last_resync >= self.resync_interval:
+                # Diğer worker'larda oluşturulan/ilerleyen oyunları yakalamak için.
+                try:
+                    await self.rebuild()
+                except Exception as e:
+                    logger.error(f"Zaman aşımı zamanlayıcısı senkronize edilemedi: {e}", exc_info=True)
+                    self._last_resync = now
+
+            for game_id in self._pop_due(now):
+                try:
+                    next_deadline = await self._on_expire(game_id)
+                except Exception as e:
+                    logger.error(f"Zaman aşımı işlenemedi: Oyun {game_id}, Hata: {e}", exc_info=True)
+                    continue
+                if next_deadline is not None:
+                    self.schedule(game_id, next_deadline)
+                else:
+                    self.expired_count += 1
+
+            next_wake = self._last_resync + self.resync_interval
+            if self._heap:
+                next_wake = min(next_wake, self._heap[0][0])
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(0.0, next_wake - time.time()))
+            except asyncio.TimeoutError:
+                pass
+
+
+timeout_scheduler = TimeoutScheduler()
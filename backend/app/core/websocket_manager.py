@@ -1,20 +1,332 @@
+import asyncio
 import logging
 import json
+import time
+from collections import deque, OrderedDict
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Set
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple, Union
 
+from app.config import PUBSUB_BACKEND, PUBSUB_BROKER_HOST, PUBSUB_BROKER_PORT
+from app.core.board_wire import LEGACY_BOARD_FORMAT
+from app.core.frame_codecs import CODECS, DEFAULT_CODEC, CodecStats, Frame, FrameEncoder
 from app.core.jwt_handler import verify_token
-from app.models.websocket_models import WebSocketMessage
+from app.core.pubsub import PubSubBus, InProcessBus, create_bus
+from app.core.state_projection import StateProjection
+from app.core.stats import percentile, to_ms
+from app.models.websocket_models import WebSocketMessage, ResyncMessage
 
 logger = logging.getLogger("websocket_manager")
 logger.setLevel(logging.INFO)
 
-class ConnectionManager:
+SEND_QUEUE_SIZE = 32
+MAX_RESYNCS = 3
+REPLAY_BUFFER_SIZE = 64
+MAX_REPLAY_ROOMS = 2048
+# Oda yayınlarının sıra numarası oyun belgesinin sürümünden türetilir: sürüm * SEQS_PER_VERSION + sürümdeki sırası.
+# Bir sürümü yalnızca onu yazan worker yayınladığından sürüm içindeki sıra yerel sayaçla verilir; veritabanına gidilmez.
+SEQS_PER_VERSION = 1000
+VERSIONS_KEPT = 8
+
+ReplayEntry = Optional[Union[str, StateProjection]]
+
+class OutboundConnection:
+    __slots__ = ("websocket", "username", "room_id", "codec", "board_format", "queue", "writer", "resyncs")
+
+    def __init__(
+        self, websocket: WebSocket, username: str, room_id: Optional[str],
+        codec: str = DEFAULT_CODEC, board_format: int = LEGACY_BOARD_FORMAT
+    ):
+        self.websocket = websocket
+        self.username = username
+        self.room_id = room_id
+        self.codec = codec
+        self.board_format = board_format
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+        self.writer: Optional[asyncio.Task] = None
+        self.resyncs = 0
+
+class RoomReplay:
+    # Odanın son yayınları sıra numarasıyla tutulur; kopan istemci sadece kaçırdıklarını alır.
+    # Durum mesajları tam durum taşıdığından sadece en sonuncusu saklanır, öncekiler None olur.
+    __slots__ = ("seq", "entries", "version", "sent")
+
     def __init__(self):
+        self.seq = 0
+        self.entries: Deque[Tuple[int, ReplayEntry]] = deque(maxlen=REPLAY_BUFFER_SIZE)
+        self.version = 0
+        self.sent: Dict[int, int] = {}
+
+    def next_seq(self, version: Optional[int]) -> int:
+        # Sürüm verilmezse (bildirimler) bu worker'ın son yayınladığı durumun sürümü kullanılır.
+        if version is None:
+            version = self.version
+        elif version > self.version:
+            self.version = version
+            for old in [v for v in self.sent if v < version - VERSIONS_KEPT]:
+                del self.sent[old]
+        count = self.sent.get(version, 0) + 1
+        if count >= SEQS_PER_VERSION:
+            logger.error(f"Sürüm {version} için yayın sayısı {SEQS_PER_VERSION} sınırını aştı.")
+            count = SEQS_PER_VERSION - 1
+        self.sent[version] = count
+        return version * SEQS_PER_VERSION + count
+
+    def record(self, seq: int, entry: ReplayEntry):
+        # Farklı worker'ların yayınları (farklı sürümler) sırasız ulaşabilir;
+        # tampon sıralı tutulur, tekrarlar ve tamponun gerisinde kalanlar atılır.
+        entries = self.entries
+        pos = len(entries)
+        while pos > 0 and entries[pos - 1][0] > seq:
+            pos -= 1
+        if pos > 0 and entries[pos - 1][0] == seq:
+            return
+        if pos == 0 and entries and len(entries) == entries.maxlen:
+            return
+        if seq > self.seq:
+            self.seq = seq
+        if isinstance(entry, StateProjection):
+            if any(isinstance(later, StateProjection) for _, later in list(entries)[pos:]):
+                entry = None
+            else:
+                for i in range(pos - 1, -1, -1):
+                    if isinstance(entries[i][1], StateProjection):
+                        entries[i] = (entries[i][0], None)
+                        break
+        if pos == len(entries):
+            entries.append((seq, entry))
+            return
+        if len(entries) == entries.maxlen:
+            entries.popleft()
+            pos -= 1
+        entries.insert(pos, (seq, entry))
+
+    def since(self, last_seq: int) -> Optional[List[Tuple[int, ReplayEntry]]]:
+        # None: boşluk tampondan büyük (veya istemci bu worker'ın bilmediği bir sırada), anlık görüntü gerekir.
+        # Numaralar ardışık olmadığından istemcinin son gördüğü numara tamponda olmalıdır; 1 odanın ilk yayınıdır.
+        if last_seq == self.seq:
+            return []
+        if last_seq > self.seq or not self.entries:
+            return None
+        entries = list(self.entries)
+        if last_seq == 0 and entries[0][0] == 1:
+            start = 0
+        else:
+            start = next((i + 1 for i, (seq, _) in enumerate(entries) if seq == last_seq), None)
+            if start is None:
+                return None
+        return [(seq, entry) for seq, entry in entries[start:] if entry is not None]
+
+class ConnectionManager:
+    def __init__(self, latency_samples: int = 2048, bus: Optional[PubSubBus] = None):
         self.rooms: Dict[str, Set[WebSocket]] = {}
         self.authenticated_users: Dict[WebSocket, str] = {}
+        self.lobby: Dict[str, Set[WebSocket]] = {}
+        self.connections: Dict[WebSocket, OutboundConnection] = {}
+        self._send_latencies: Deque[float] = deque(maxlen=latency_samples)
+        self.messages_sent = 0
+        self.resyncs = 0
+        self.dropped = 0
+        self.codec_stats: Dict[str, CodecStats] = {}
+        self.bus = bus or InProcessBus()
+        self.replays: "OrderedDict[str, RoomReplay]" = OrderedDict()
+        # Oda için serialize_game_data çıktısını döner; main.py'de oyun router'ı bağlar.
+        self.snapshot_loader: Optional[Callable[[str], Awaitable[Optional[Dict[str, Any]]]]] = None
+        self.replayed = 0
+        self.snapshots = 0
+
+    async def start_bus(self):
+        await self.bus.start(self._on_bus_message)
+
+    async def stop_bus(self):
+        await self.bus.stop()
+
+    async def _on_bus_message(self, kind: str, target: str, text: str, seq: int = 0):
+        # Başka bir worker'da yayınlanan mesaj: sadece bu süreçteki soketlere teslim edilir.
+        if kind == "room":
+            self._replay(target).record(seq, text)
+            self._deliver_room(target, text)
+        elif kind == "user":
+            self._deliver_user(target, text)
+        elif kind == "state":
+            projection = StateProjection.from_wire(text)
+            self._replay(target).record(projection.seq, projection)
+            self._deliver_state(target, projection)
+
+    def _replay(self, room_id: str) -> RoomReplay:
+        replay = self.replays.get(room_id)
+        if replay is None:
+            replay = self.replays[room_id] = RoomReplay()
+            if len(self.replays) > MAX_REPLAY_ROOMS:
+                self.replays.popitem(last=False)
+        else:
+            self.replays.move_to_end(room_id)
+        return replay
+
+    def _render(self, conn: OutboundConnection, entry: ReplayEntry) -> Frame:
+        text = entry.message_for(conn.username, conn.board_format) if isinstance(entry, StateProjection) else entry
+        return CODECS[conn.codec](text)
+
+    async def _resume(self, websocket: WebSocket, room_id: str, last_seq: int):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        replay = self.replays.get(room_id)
+        missed = replay.since(last_seq) if replay else ([] if last_seq == 0 else None)
+        if missed is not None and len(missed) < SEND_QUEUE_SIZE:
+            for _, entry in missed:
+                self._enqueue(websocket, self._render(conn, entry))
+            self.replayed += len(missed)
+            return
+
+        # Boşluk çok büyük: tam durum gönderilir, yükleme sırasında gelenler ardından eklenir.
+        self.snapshots += 1
+        snapshot_seq = replay.seq if replay else 0
+        game_data = None
+        if self.snapshot_loader is not None:
+            try:
+                game_data = await self.snapshot_loader(room_id)
+            except Exception as e:
+                logger.error(f"{room_id} için anlık görüntü yüklenemedi: {e}", exc_info=True)
+        if game_data:
+            self._enqueue(websocket, self._render(conn, StateProjection(game_data, snapshot_seq)))
+        else:
+            resync = ResyncMessage(payload={"reason": "replay_gap", "room_id": room_id}, seq=snapshot_seq)
+            self._enqueue(websocket, CODECS[conn.codec](resync.model_dump_json()))
+        replay = self.replays.get(room_id)
+        arrived = replay.since(snapshot_seq) if replay else None
+        for _, entry in arrived or []:
+            self._enqueue(websocket, self._render(conn, entry))
+
+    def _deliver(self, sockets, text: str):
+        encoder = FrameEncoder(text, self.codec_stats)
+        for connection in list(sockets):
+            conn = self.connections.get(connection)
+            if conn is not None:
+                self._enqueue(connection, encoder.get(conn.codec))
+
+    def _deliver_room(self, room_id: str, text: str):
+        self._deliver(self.rooms.get(room_id, ()), text)
+
+    def _deliver_user(self, username: str, text: str):
+        self._deliver(self.lobby.get(username, ()), text)
+
+    def _deliver_state(self, room_id: str, projection: StateProjection):
+        # Alıcı türü (iki oyuncu, izleyiciler) ve tahta biçimi başına en fazla bir çerçeve ve kodlama.
+        encoders: Dict[Tuple[Optional[str], int], FrameEncoder] = {}
+        for connection in list(self.rooms.get(room_id, ())):
+            conn = self.connections.get(connection)
+            if conn is None:
+                continue
+            key = (projection.viewer_key(conn.username), conn.board_format)
+            encoder = encoders.get(key)
+            if encoder is None:
+                encoder = encoders[key] = FrameEncoder(projection.message_for(*key), self.codec_stats)
+            self._enqueue(connection, encoder.get(conn.codec))
+
+    def _open(
+        self, websocket: WebSocket, username: str, room_id: Optional[str],
+        codec: str = DEFAULT_CODEC, board_format: int = LEGACY_BOARD_FORMAT
+    ):
+        conn = OutboundConnection(websocket, username, room_id, codec, board_format)
+        conn.writer = asyncio.create_task(self._drain(conn))
+        self.connections[websocket] = conn
 
-    async def connect(self, websocket: WebSocket, room_id: str, token: str | None = None):
+    def _close(self, websocket: WebSocket):
+        conn = self.connections.pop(websocket, None)
+        if conn and conn.writer and conn.writer is not asyncio.current_task():
+            conn.writer.cancel()
+
+    def _forget(self, conn: OutboundConnection):
+        if conn.room_id is None:
+            self.disconnect_lobby(conn.websocket, conn.username)
+        else:
+            self.disconnect(conn.websocket, conn.room_id)
+
+    async def _drain(self, conn: OutboundConnection):
+        # Her bağlantının kendi yazıcısı var; yavaş bir istemci odadaki diğerlerini bekletmez.
+        while True:
+            frame, enqueued_at = await conn.queue.get()
+            try:
+                if isinstance(frame, bytes):
+                    await conn.websocket.send_bytes(frame)
+                else:
+                    await conn.websocket.send_text(frame)
+            except Exception as e:
+                logger.warning(f"{conn.username} bağlantısına gönderim başarısız, bağlantı kesiliyor. Hata: {e}")
+                self._forget(conn)
+                return
+            self._send_latencies.append(time.perf_counter() - enqueued_at)
+            self.messages_sent += 1
+
+    def _enqueue(self, websocket: WebSocket, frame: Frame):
+        conn = self.connections.get(websocket)
+        if conn is None:
+            return
+        now = time.perf_counter()
+        try:
+            conn.queue.put_nowait((frame, now))
+            return
+        except asyncio.QueueFull:
+            pass
+
+        conn.resyncs += 1
+        if conn.resyncs > MAX_RESYNCS:
+            logger.warning(f"{conn.username} çok yavaş, bağlantı düşürülüyor (oda: {conn.room_id}).")
+            self.dropped += 1
+            self._forget(conn)
+            asyncio.create_task(self._close_slow(websocket))
+            return
+
+        # Kuyruk taştı: bekleyen mesajlar atılır, istemciye tam durumu yeniden çekmesi söylenir.
+        self.resyncs += 1
+        while not conn.queue.empty():
+            conn.queue.get_nowait()
+        resync = ResyncMessage(payload={"reason": "send_queue_overflow", "room_id": conn.room_id})
+        conn.queue.put_nowait((CODECS[conn.codec](resync.model_dump_json()), now))
+        conn.queue.put_nowait((frame, now))
+        logger.info(f"{conn.username} için gönderim kuyruğu taştı, yeniden senkronizasyon istendi.")
+
+    async def _close_slow(self, websocket: WebSocket):
+        try:
+            await websocket.close(code=4008, reason="Slow consumer")
+        except Exception:
+            pass
+
+    def stats(self) -> Dict:
+        depths = [conn.queue.qsize() for conn in self.connections.values()]
+        latencies = list(self._send_latencies)
+        return {
+            "connections": len(self.connections),
+            "rooms": len(self.rooms),
+            "lobby_users": len(self.lobby),
+            "queue_depth": {
+                "total": sum(depths),
+                "max": max(depths, default=0),
+                "capacity": SEND_QUEUE_SIZE,
+            },
+            "send_latency_ms": {
+                "count": len(latencies),
+                "p50": to_ms(percentile(latencies, 50)),
+                "p99": to_ms(percentile(latencies, 99)),
+            },
+            "messages_sent": self.messages_sent,
+            "resyncs": self.resyncs,
+            "dropped": self.dropped,
+            "replay": {
+                "rooms": len(self.replays),
+                "replayed": self.replayed,
+                "snapshots": self.snapshots,
+            },
+            "codecs": {name: stat.to_dict() for name, stat in self.codec_stats.items()},
+            "bus": {
+                "backend": type(self.bus).__name__,
+                "worker_id": self.bus.worker_id,
+                "published": self.bus.published,
+                "received": self.bus.received,
+            },
+        }
+
+    async def _authenticate(self, websocket: WebSocket, label: str, token: str | None) -> str | None:
         await websocket.accept()
         username = None
         if token:
@@ -23,15 +335,28 @@ class ConnectionManager:
                 username = payload.get("sub")
 
         if not username:
-            logger.warning(f"Kimliği doğrulanmamış bağlantı reddedildi: {room_id}")
+            logger.warning(f"Kimliği doğrulanmamış bağlantı reddedildi: {label}")
             await websocket.close(code=4001, reason="Authentication required")
+        return username
+
+    async def connect(
+        self, websocket: WebSocket, room_id: str, token: str | None = None,
+        codec: str = DEFAULT_CODEC, last_seq: Optional[int] = None,
+        board_format: int = LEGACY_BOARD_FORMAT
+    ):
+        username = await self._authenticate(websocket, room_id, token)
+        if not username:
             return False
 
+        self.authenticated_users[websocket] = username
+        self._open(websocket, username, room_id, codec, board_format)
+        if last_seq is not None:
+            # Kaçırılanlar odaya eklenmeden önce sıraya alınır ki yeni yayınlarla karışmasın.
+            await self._resume(websocket, room_id, last_seq)
         if room_id not in self.rooms:
             self.rooms[room_id] = set()
         self.rooms[room_id].add(websocket)
-        self.authenticated_users[websocket] = username
-        logger.info(f"WebSocket bağlandı: {username}, oda: {room_id} ({len(self.rooms[room_id])} kullanıcı)")
+        logger.info(f"WebSocket bağlandı: {username}, oda: {room_id}, kodlama: {codec} ({len(self.rooms[room_id])} kullanıcı)")
         return True
 
     def disconnect(self, websocket: WebSocket, room_id: str):
@@ -39,38 +364,65 @@ class ConnectionManager:
             self.rooms[room_id].discard(websocket)
             if not self.rooms[room_id]:
                  del self.rooms[room_id]
+        self._close(websocket)
         username = self.authenticated_users.pop(websocket, "Unknown")
         logger.info(f"WebSocket bağlantısı kesildi: {username}, oda: {room_id}")
 
+    async def connect_lobby(self, websocket: WebSocket, token: str | None = None) -> str | None:
+        username = await self._authenticate(websocket, "lobby", token)
+        if not username:
+            return None
+        self.lobby.setdefault(username, set()).add(websocket)
+        self._open(websocket, username, None)
+        logger.info(f"Lobi bağlantısı açıldı: {username} ({len(self.lobby[username])} bağlantı)")
+        return username
+
+    def disconnect_lobby(self, websocket: WebSocket, username: str):
+        sockets = self.lobby.get(username)
+        if sockets is not None:
+            sockets.discard(websocket)
+            if not sockets:
+                del self.lobby[username]
+        self._close(websocket)
+        logger.info(f"Lobi bağlantısı kapandı: {username}")
+
+    async def send_to_user(self, username: str, message: WebSocketMessage):
+        # Kullanıcının lobi soketi başka bir worker'da olabilir; yerelde olmasa da yayınlanır.
+        message_json = message.model_dump_json()
+        self._deliver_user(username, message_json)
+        await self.bus.publish("user", username, message_json)
+
+    async def notify_user(self, username: str | None, event: str, payload: Dict):
+        if not username:
+            return
+        from app.models.websocket_models import LobbyEventMessage
+        await self.send_to_user(username, LobbyEventMessage(payload={"event": event, **payload}))
+
     async def send_personal_message(self, message: WebSocketMessage, websocket: WebSocket):
-        try:
-            await websocket.send_text(message.model_dump_json())
-        except Exception as e:
-            logger.error(f"Özel mesaj gönderimi hatası: {e}")
+        conn = self.connections.get(websocket)
+        if conn is not None:
+            self._enqueue(websocket, CODECS[conn.codec](message.model_dump_json()))
 
-    async def broadcast(self, room_id: str, message: WebSocketMessage):
-        if room_id in self.rooms:
-            disconnected_websockets = set()
-            message_json = message.model_dump_json()
-            for connection in self.rooms[room_id]:
-                try:
-                    await connection.send_text(message_json)
-                except Exception as e:
-                    logger.warning(f"{room_id} odasındaki bir bağlantı  başarısız oldu, bağlantı kesiliyor. Hata: {e}")
-                    disconnected_websockets.add(connection)
-
-            for ws in disconnected_websockets:
-                 self.disconnect(ws, room_id)
+    async def broadcast(self, room_id: str, message: WebSocketMessage, version: Optional[int] = None):
+        replay = self._replay(room_id)
+        seq = replay.next_seq(version)
+        message_json = message.model_copy(update={"seq": seq}).model_dump_json()
+        replay.record(seq, message_json)
+        self._deliver_room(room_id, message_json)
+        await self.bus.publish("room", room_id, message_json, seq)
 
     async def broadcast_game_state(self, room_id: str, game_data: Dict):
-        from app.models.websocket_models import GameStateUpdateMessage
-        message = GameStateUpdateMessage(payload=game_data)
-        await self.broadcast(room_id, message)
+        # game_data serialize_game_data çıktısıdır; her alıcı sadece kendi elini görür.
+        replay = self._replay(room_id)
+        projection = StateProjection(game_data, replay.next_seq(game_data.get("version", 0)))
+        replay.record(projection.seq, projection)
+        self._deliver_state(room_id, projection)
+        await self.bus.publish("state", room_id, projection.to_wire(), projection.seq)
 
-    async def broadcast_notification(self, room_id: str, notification: str):
+    async def broadcast_notification(self, room_id: str, notification: str, version: Optional[int] = None):
         from app.models.websocket_models import NotificationMessage
         message = NotificationMessage(payload={"message": notification})
-        await self.broadcast(room_id, message)
+        await self.broadcast(room_id, message, version)
 
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager(bus=create_bus(PUBSUB_BACKEND, PUBSUB_BROKER_HOST, PUBSUB_BROKER_PORT))
\ No newline at end of file
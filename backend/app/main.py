@@ -1,7 +1,13 @@
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routers import auth, game, reward, websocket
+from app.routers import auth, game, reward, websocket, metrics, admin
+from app.core.game_setup_pool import setup_pool
+from app.core.timeout_scheduler import timeout_scheduler
+from app.core.matchmaking import matchmaker
+from app.core.websocket_manager import manager
+from app.core.profiler import profiler, ProfilingMiddleware
+from app.db.database import db
 
 app = FastAPI(
     title="Kelime Mayınları API",
@@ -13,12 +19,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Profile-Id"],
 )
+app.add_middleware(ProfilingMiddleware)
 
 app.include_router(auth.router)
 app.include_router(game.router)
 app.include_router(reward.router)
 app.include_router(websocket.router)
+app.include_router(metrics.router)
+app.include_router(admin.router)
+
+@app.on_event("startup")
+async def startup():
+    setup_pool.start()
+    await db.games.create_index([("status", 1), ("deadline", 1)])
+    timeout_scheduler.start(game.expire_timed_out_game, game.load_active_game_deadlines)
+    matchmaker.start_sweeper(game.start_background_match)
+    manager.snapshot_loader = game.load_game_snapshot
+    await manager.start_bus()
+    profiler.install_signal_handler()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await setup_pool.stop()
+    await timeout_scheduler.stop()
+    await matchmaker.stop_sweeper()
+    await manager.stop_bus()
 
 @app.get("/")
 async def root():
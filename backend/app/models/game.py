@@ -10,7 +10,8 @@ class GameCreate(BaseModel):
     player2_key: str = "player2"
     board: Dict[str, List[List[Dict[str, Any]]]] = Field(...)
     hands: Dict[str, List[str]] = Field(...)
-    pool: List[str] = Field(...)
+    pool: List[int] = Field(..., description="LETTER_DISTRIBUTION sırasıyla harf türü başına kalan adet")
+    pool_remaining: int = 0
 
     status: str = "waiting"
     turn: Optional[str] = None
@@ -27,11 +28,15 @@ class GameCreate(BaseModel):
     )
     consecutive_passes: int = 0
     extra_move_in_progress: bool = False
+    extra_move_pending: bool = False
     region_block: Optional[str] = None
     winner: Optional[str] = None
     lastMoveTime: float = Field(default_factory=time.time)
+    deadline: Optional[float] = None
     gameStartTime: datetime = Field(default_factory=datetime.utcnow)
     event_log: List[Dict[str, Any]] = Field(default_factory=list)
+    # Her hamle/ödül yazmasında bir artar; istemci eski state_update'leri bununla ayırt eder.
+    version: int = 0
 
     class Config:
         pass
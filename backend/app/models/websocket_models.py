@@ -4,6 +4,7 @@ from typing import Literal, Dict, Any, Optional
 class WebSocketMessage(BaseModel):
     type: str
     payload: Optional[Dict[str, Any]] = None
+    seq: Optional[int] = Field(None, description="Oda yayınlarında artan sıra numarası; yeniden bağlanırken last_seq olarak gönderilir.")
 
 class GameStateUpdateMessage(WebSocketMessage):
     type: Literal["state_update"] = "state_update"
@@ -15,4 +16,22 @@ class ErrorMessage(WebSocketMessage):
 
 class NotificationMessage(WebSocketMessage):
     type: Literal["notification"] = "notification"
-    payload: Dict[str, str]
\ No newline at end of file
+    payload: Dict[str, str]
+
+class LobbyEventMessage(WebSocketMessage):
+    type: Literal["lobby_event"] = "lobby_event"
+    payload: Dict[str, Any]
+
+class ResyncMessage(WebSocketMessage):
+    type: Literal["resync"] = "resync"
+    payload: Dict[str, Any]
+
+class RpcRequest(BaseModel):
+    type: Literal["rpc"] = "rpc"
+    id: str = Field(..., description="İstemcinin ürettiği ilişki kimliği; yanıtta aynen döner.")
+    method: Literal["preview_move", "make_move", "surrender", "use_reward"]
+    params: Dict[str, Any] = Field(default_factory=dict)
+
+class RpcResultMessage(WebSocketMessage):
+    type: Literal["rpc_result"] = "rpc_result"
+    payload: Dict[str, Any]
@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.responses import Response
+
+from app.core.profiler import profiler, ProfilerBusy
+from app.routers.auth import get_admin_user
+
+router = APIRouter(prefix="/admin", tags=["admin"])
+
+@router.post("/profile")
+async def run_profile(
+    mode: str = Query("sample", description="sample: yığın örnekleme (collapsed), cprofile: deterministik (pstats)"),
+    seconds: float = Query(10.0, gt=0, le=300),
+    requests: int = Query(None, gt=0, description="Verilirse bu kadar istek bitince (en geç seconds sonra) durur"),
+    interval_ms: float = Query(5.0, ge=1, le=1000, description="Örnekleme aralığı (sadece sample)"),
+    format: str = Query("pstats", description="cprofile çıktısı: pstats (ham dump) veya text"),
+    admin: str = Depends(get_admin_user)
+):
+    try:
+        if mode == "sample":
+            media_type, body = await profiler.sample(seconds, requests, interval_ms / 1000)
+        elif mode == "cprofile":
+            media_type, body = await profiler.cprofile(seconds, requests, format)
+        else:
+            raise HTTPException(status_code=400, detail="Geçersiz mod. Geçerli modlar: sample, cprofile")
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=f"Zaten çalışan bir profil oturumu var: {e}")
+    return Response(body, media_type=media_type, headers={"X-Profile-Id": profiler.store((media_type, body))})
+
+@router.get("/profile/{artifact_id}")
+async def get_profile(artifact_id: str, admin: str = Depends(get_admin_user)):
+    # X-Profile başlığıyla profillenen isteklerin çıktısı.
+    artifact = profiler.artifacts.get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Profil bulunamadı.")
+    media_type, body = artifact
+    return Response(body, media_type=media_type)
+
+@router.get("/profile", response_model=dict)
+async def profile_status(admin: str = Depends(get_admin_user)):
+    return profiler.stats()
@@ -2,11 +2,20 @@ from fastapi import APIRouter, HTTPException, Depends, Header
 from typing import Optional
 from app.models.user import UserCreate, UserLogin
 from app.db.database import db
-from app.core.security import hash_password, verify_password
+from app.core.security import password_hasher, HashingSaturated
 from app.core.jwt_handler import create_access_token, verify_token
+from app.core.rating import DEFAULT_RATING
+from app.config import ADMIN_USERNAMES
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
+def _hashing_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Sunucu yoğun, lütfen birazdan tekrar deneyin.",
+        headers={"Retry-After": "1"},
+    )
+
 @router.post("/register", response_model=dict)
 async def register(user: UserCreate):
     existing = await db.users.find_one({"username": user.username})
@@ -20,18 +29,34 @@ async def register(user: UserCreate):
             detail="Şifre 8+, büyük/küçük harf ve rakam içermeli."
         )
     data = user.dict()
-    hashed = hash_password(data.pop("password"))
+    try:
+        hashed = await password_hasher.hash(data.pop("password"))
+    except HashingSaturated:
+        raise _hashing_busy()
     data["hashed_password"] = hashed
     data["wins"] = 0
     data["total_games"] = 0
+    data["rating"] = DEFAULT_RATING
     await db.users.insert_one(data)
     return {"message": "Kayıt başarılı"}
 
 @router.post("/login", response_model=dict)
 async def login(user: UserLogin):
     dbu = await db.users.find_one({"username": user.username})
-    if not dbu or not verify_password(user.password, dbu["hashed_password"]):
+    if not dbu:
+        raise HTTPException(status_code=400, detail="Geçersiz kullanıcı adı veya şifre")
+    try:
+        valid, new_hash = await password_hasher.verify(user.password, dbu["hashed_password"])
+    except HashingSaturated:
+        raise _hashing_busy()
+    if not valid:
         raise HTTPException(status_code=400, detail="Geçersiz kullanıcı adı veya şifre")
+    if new_hash:
+        # Maliyet parametresi değişmiş: şifre elimizdeyken hash yeni ayarla güncellenir.
+        await db.users.update_one(
+            {"_id": dbu["_id"], "hashed_password": dbu["hashed_password"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
     token = create_access_token({"sub": dbu["username"]})
     return {
         "access_token": token,
@@ -49,3 +74,12 @@ async def get_current_user(
     if payload is None:
         raise HTTPException(status_code=401, detail="Token geçersiz veya süresi dolmuş.")
     return payload["sub"]
+
+async def get_admin_user(current_user: str = Depends(get_current_user)):
+    if current_user not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Bu işlem için yönetici yetkisi gerekli.")
+    return current_user
+
+@router.get("/hash_stats", response_model=dict)
+async def hash_stats(current_user: str = Depends(get_current_user)):
+    return password_hasher.stats()
@@ -1,29 +1,29 @@
 import random
 import logging
-from typing import List, Dict, Tuple, Any, Set
+from typing import List, Dict, Tuple, Any, Set, Optional
 import pathlib
 import math
-import time
 
 
-logger = logging.getLogger("game_utils")
-if not logger.hasHandlers():
+from app.core.logging_config import configure_logging
 
-    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    logger.info("game_utils logger başlatıldı.")
+configure_logging()
+logger = logging.getLogger("game_utils")
 
 
 BASE_DIR = pathlib.Path(__file__).parent.resolve()
 KELIME_LISTESI_PATH = BASE_DIR / "kelime_listesi.txt"
 WORD_LIST: Set[str] = set()
 
+def load_word_list(path: pathlib.Path = KELIME_LISTESI_PATH) -> Set[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return {line.strip().lower() for line in f if line.strip()}
+
 try:
 
     if KELIME_LISTESI_PATH.is_file():
-        with open(KELIME_LISTESI_PATH, "r", encoding="utf-8") as f:
-
-            WORD_LIST = {line.strip().lower() for line in f if line.strip()}
-            logger.info(f"{len(WORD_LIST)} kelime başarıyla yüklendi: {KELIME_LISTESI_PATH}")
+        WORD_LIST = load_word_list(KELIME_LISTESI_PATH)
+        logger.info(f"{len(WORD_LIST)} kelime başarıyla yüklendi: {KELIME_LISTESI_PATH}")
     else:
         logger.warning(f"Kelime listesi bulunamadı: {KELIME_LISTESI_PATH}")
 except Exception as e:
@@ -78,34 +78,106 @@ MINE_POOL = [m for m, count in MINE_TYPES_COUNT.items() for _ in range(count)]
 REWARD_POOL = [r for r, count in REWARD_TYPES_COUNT.items() for _ in range(count)]
 
 
-def generate_letter_pool() -> List[str]:
-    pool = []
-    for letter, data in LETTER_DISTRIBUTION.items():
-        pool.extend([letter] * data["count"])
-    random.shuffle(pool)
-    logger.debug(f"{len(pool)} harflik yeni havuz oluşturuldu.")
+LETTER_KINDS: List[str] = list(LETTER_DISTRIBUTION.keys())
+LETTER_KIND_INDEX: Dict[str, int] = {letter: i for i, letter in enumerate(LETTER_KINDS)}
+FULL_POOL_COUNTS: Tuple[int, ...] = tuple(LETTER_DISTRIBUTION[letter]["count"] for letter in LETTER_KINDS)
+
+
+class LetterPool:
+    __slots__ = ("counts", "remaining")
+
+    def __init__(self, counts: List[int]):
+        if len(counts) != len(LETTER_KINDS):
+            raise ValueError(f"Havuz sayaç vektörü {len(LETTER_KINDS)} elemanlı olmalı, {len(counts)} geldi.")
+        self.counts: List[int] = [max(0, int(n)) for n in counts]
+        self.remaining: int = sum(self.counts)
+
+    @classmethod
+    def full(cls) -> "LetterPool":
+        return cls(list(FULL_POOL_COUNTS))
+
+    @classmethod
+    def from_letters(cls, letters: List[str]) -> "LetterPool":
+        counts = [0] * len(LETTER_KINDS)
+        for letter in letters:
+            idx = LETTER_KIND_INDEX.get(str(letter).upper())
+            if idx is None:
+                logger.warning("Havuzda bilinmeyen harf atlandı: %r", letter)
+                continue
+            counts[idx] += 1
+        return cls(counts)
+
+    @classmethod
+    def load(cls, stored: Any) -> "LetterPool":
+        # Eski oyunlar havuzu harf listesi olarak, yenileri sayaç vektörü olarak saklar.
+        if isinstance(stored, LetterPool):
+            return stored.copy()
+        if not stored:
+            return cls([0] * len(LETTER_KINDS))
+        if all(isinstance(n, int) for n in stored) and len(stored) == len(LETTER_KINDS):
+            return cls(list(stored))
+        return cls.from_letters(stored)
+
+    def copy(self) -> "LetterPool":
+        return LetterPool(self.counts[:])
+
+    def draw_one(self, rng: random.Random = random) -> Optional[str]:
+        if self.remaining <= 0:
+            return None
+        # Sabit 30 harf türü üzerinde ağırlıklı seçim: torba boyutundan bağımsız.
+        pick = rng.randrange(self.remaining)
+        for idx, n in enumerate(self.counts):
+            if pick < n:
+                self.counts[idx] -= 1
+                self.remaining -= 1
+                return LETTER_KINDS[idx]
+            pick -= n
+        return None
+
+    def draw(self, count: int, rng: random.Random = random) -> List[str]:
+        drawn = []
+        for _ in range(min(count, self.remaining)):
+            drawn.append(self.draw_one(rng))
+        return drawn
+
+    def to_counts(self) -> List[int]:
+        return self.counts[:]
+
+    def to_letters(self) -> List[str]:
+        return [letter for letter, n in zip(LETTER_KINDS, self.counts) for _ in range(n)]
+
+    def __len__(self) -> int:
+        return self.remaining
+
+    def __bool__(self) -> bool:
+        return self.remaining > 0
+
+
+def generate_letter_pool() -> LetterPool:
+    pool = LetterPool.full()
+    logger.debug("%d harflik yeni havuz oluşturuldu.", pool.remaining)
     return pool
 
-def deal_letters(pool: List[str], count: int) -> List[str]:
-    drawn = []
-    actual_count = min(count, len(pool))
-    for _ in range(actual_count):
-        if pool:
-            drawn.append(pool.pop())
-    logger.debug(f"{len(drawn)} harf çekildi. Havuzda kalan: {len(pool)}")
-    return [str(letter) for letter in drawn]
+def deal_letters(pool: LetterPool, count: int, rng: random.Random = random) -> List[str]:
+    drawn = pool.draw(count, rng)
+    logger.debug("%d harf çekildi. Havuzda kalan: %d", len(drawn), pool.remaining)
+    return drawn
+
+# Sabit bonus kareleri; her oyunda aynıdır, seyrek tahta biçiminde BOARD_LAYOUT_ID ile anılır.
+BOARD_SIZE = 15
+BOARD_LAYOUT_ID = "standard-15"
+BONUS_COORDS: Dict[str, List[Tuple[int, int]]] = {
+    "K3": [(0, 0), (0, 7), (0, 14), (7, 0), (7, 14), (14, 0), (14, 7), (14, 14)],
+    "K2": [(1, 1), (2, 2), (3, 3), (4, 4), (1, 13), (2, 12), (3, 11), (4, 10), (10, 4), (11, 3), (12, 2), (13, 1), (10, 10), (11, 11), (12, 12), (13, 13)],
+    "H3": [(1, 5), (1, 9), (5, 1), (5, 5), (5, 9), (5, 13), (9, 1), (9, 5), (9, 9), (9, 13), (13, 5), (13, 9)],
+    "H2": [(0, 3), (0, 11), (2, 6), (2, 8), (3, 0), (3, 7), (3, 14), (6, 2), (6, 6), (6, 8), (6, 12), (7, 3), (7, 11), (8, 2), (8, 6), (8, 8), (8, 12), (11, 0), (11, 7), (11, 14), (12, 6), (12, 8), (14, 3), (14, 11)],
+    "start": [(7, 7)]
+}
 
 def assign_solid_bonuses(board: List[List[Dict]]):
-    rows, cols = 15, 15
-    bonus_coords = {
-        "K3": [(0, 0), (0, 7), (0, 14), (7, 0), (7, 14), (14, 0), (14, 7), (14, 14)],
-        "K2": [(1, 1), (2, 2), (3, 3), (4, 4), (1, 13), (2, 12), (3, 11), (4, 10), (10, 4), (11, 3), (12, 2), (13, 1), (10, 10), (11, 11), (12, 12), (13, 13)],
-        "H3": [(1, 5), (1, 9), (5, 1), (5, 5), (5, 9), (5, 13), (9, 1), (9, 5), (9, 9), (9, 13), (13, 5), (13, 9)],
-        "H2": [(0, 3), (0, 11), (2, 6), (2, 8), (3, 0), (3, 7), (3, 14), (6, 2), (6, 6), (6, 8), (6, 12), (7, 3), (7, 11), (8, 2), (8, 6), (8, 8), (8, 12), (11, 0), (11, 7), (11, 14), (12, 6), (12, 8), (14, 3), (14, 11)],
-        "start": [(7, 7)]
-    }
+    rows, cols = BOARD_SIZE, BOARD_SIZE
     count = 0
-    for bonus_type, coords_list in bonus_coords.items():
+    for bonus_type, coords_list in BONUS_COORDS.items():
         for r, c in coords_list:
             if 0 <= r < rows and 0 <= c < cols:
                  if r < len(board) and c < len(board[r]):
@@ -240,7 +312,8 @@ def trace_word_in_line(board: List[List[Dict]], start_r: int, start_c: int, dr:
 
 
 
-def find_all_formed_words(board: List[List[Dict]], placed_positions: List[List[int]]) -> Tuple[List[Dict], bool, List[str]]:
+def find_all_formed_words(board: List[List[Dict]], placed_positions: List[List[int]], timer=None) -> Tuple[List[Dict], bool, List[str]]:
+    # timer (app.core.metrics.PhaseTimer) verilirse kelime çıkarma ve sözlük kontrolü ayrı aşamalar olarak ölçülür.
     if not placed_positions:
         return [], False, ["Yerleştirilmiş harf yok."]
 
@@ -309,15 +382,18 @@ def find_all_formed_words(board: List[List[Dict]], placed_positions: List[List[i
              return [], False, ["Geçerli bir kelime oluşturulamadı."]
 
 
+    if timer is not None:
+        timer.lap("word_extraction")
+
     valid_formed_word_details = []
     all_words_valid = True
     invalid_words_list = []
 
-    logger.debug(f"Doğrulanacak potansiyel kelimeler: {list(potential_words_details.keys())}")
+    logger.debug("Doğrulanacak potansiyel kelimeler: %s", potential_words_details.keys())
 
     for word_str, tiles in potential_words_details.items():
         if not is_valid_word(word_str):
-            logger.warning(f"Geçersiz kelime bulundu: '{word_str}'")
+            logger.warning("Geçersiz kelime bulundu: '%s'", word_str)
             all_words_valid = False
             if word_str not in invalid_words_list:
                 invalid_words_list.append(word_str)
@@ -329,12 +405,16 @@ def find_all_formed_words(board: List[List[Dict]], placed_positions: List[List[i
              })
 
 
+    if timer is not None:
+        timer.lap("dictionary_lookup")
+
     if not all_words_valid:
-        logger.warning(f"Hamle geçersiz, geçersiz kelimeler: {invalid_words_list}")
+        logger.warning("Hamle geçersiz, geçersiz kelimeler: %s", invalid_words_list)
         return [], False, invalid_words_list
 
 
-    logger.debug(f"Hamle geçerli, bulunan kelimeler: {[wd['word'] for wd in valid_formed_word_details]}")
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Hamle geçerli, bulunan kelimeler: %s", [wd['word'] for wd in valid_formed_word_details])
     return valid_formed_word_details, True, []
 
 
@@ -368,13 +448,13 @@ def calculate_word_score(board: List[List[Dict]], word_tiles: List[Dict], placed
 
 
     final_score = word_score * word_multiplier
-    logger.debug(f"Skor hesaplandı: Kelime='{word_str}', Skor={word_score}, Çarpan={word_multiplier}, Final={final_score}")
+    logger.debug("Skor hesaplandı: Kelime='%s', Skor=%d, Çarpan=%d, Final=%d", word_str, word_score, word_multiplier, final_score)
     return final_score
 
 
 def apply_mine_and_reward_effects(
     game_data: Dict, placed_tiles_info: List[Dict], score_gain: int,
-    player_key: str, opponent_key: str
+    player_key: str, opponent_key: str, now: float
 ) -> Dict:
     updates: Dict[str, Any] = {}
     notifications: List[str] = []
@@ -399,7 +479,7 @@ def apply_mine_and_reward_effects(
     triggered_rewards_types = []
     db_updates_for_triggered_items = {}
 
-    event_timestamp = time.time()
+    event_timestamp = now
 
 
     for tile_info in placed_tiles_info:
@@ -431,8 +511,9 @@ def apply_mine_and_reward_effects(
             effect_desc = f"{reward_type.replace('_', ' ').title()}"
             notifications.append(f"🎁 Ödül Kazanıldı [{r},{c}]: {effect_desc}")
 
-            current_player_rewards = available_rewards.setdefault(player_key, [])
-            current_player_rewards.append(reward_type)
+            # Listeye eklemek yerine yenisi kurulur; çağıranın oyun belgesi değişmez.
+            current_player_rewards = available_rewards.get(player_key, []) + [reward_type]
+            available_rewards[player_key] = current_player_rewards
             db_updates_for_triggered_items[f"allAvailableRewards.{player_key}"] = current_player_rewards
 
             db_updates_for_triggered_items[f"internal_rewards_on_board.{coord_key}"] = ""
@@ -521,5 +602,35 @@ def apply_mine_and_reward_effects(
         "extra_move_in_progress": extra_move_in_progress,
         "triggered_events": triggered_events
     }
-    logger.debug(f"Mayın/Ödül etkileri sonucu: {result}")
-    return result
\ No newline at end of file
+    logger.debug("Mayın/Ödül etkileri sonucu: %s", result)
+    return result
+
+FIRST_MOVE_TIME_LIMIT_SECONDS = 3600
+DEFAULT_MOVE_TIME_LIMIT_SECONDS = 300
+
+def move_time_limit_seconds(time_option_str: Optional[str], is_first_move: bool) -> int:
+    if is_first_move:
+        return FIRST_MOVE_TIME_LIMIT_SECONDS
+    if not time_option_str:
+        logger.warning("timeOption tanımsız, 5dk varsayıldı.")
+        return DEFAULT_MOVE_TIME_LIMIT_SECONDS
+    time_option_str = time_option_str.lower()
+    numeric_part = "".join(filter(str.isdigit, time_option_str))
+    unit = "".join(filter(str.isalpha, time_option_str))
+    try:
+        value = int(numeric_part) if numeric_part else 0
+    except ValueError:
+        logger.warning(f"Geçersiz zaman değeri '{numeric_part}', 5dk varsayıldı.")
+        return DEFAULT_MOVE_TIME_LIMIT_SECONDS
+    if unit == 'm': limit = value * 60
+    elif unit == 'h': limit = value * 3600
+    else:
+        logger.warning(f"Geçersiz zaman birimi '{unit}', 5dk varsayıldı.")
+        return DEFAULT_MOVE_TIME_LIMIT_SECONDS
+    if limit <= 0:
+        logger.warning(f"Hesaplanan süre limiti <= 0 ({limit}), 5dk varsayıldı.")
+        return DEFAULT_MOVE_TIME_LIMIT_SECONDS
+    return limit
+
+def board_is_empty(board_grid: List[List[Dict]]) -> bool:
+    return not any(cell.get("letter") for row in board_grid for cell in row if cell and cell.get("letter"))
@@ -0,0 +1,25 @@
+from fastapi import APIRouter
+from starlette.responses import Response
+
+from app.core.metrics import CONTENT_TYPE, registry, register_gauge
+from app.core.websocket_manager import manager
+
+router = APIRouter()
+
+
+def _websocket_connections():
+    worker = manager.bus.worker_id
+    lobby = sum(1 for conn in manager.connections.values() if conn.room_id is None)
+    return [((worker, "game"), len(manager.connections) - lobby), ((worker, "lobby"), lobby)]
+
+
+register_gauge(
+    "kelime_websocket_connections", "Bu worker'daki açık WebSocket bağlantıları", ("worker", "kind"),
+    _websocket_connections,
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Prometheus kazıyıcısı için; kimlik doğrulama yok, ağ seviyesinde kısıtlanmalı.
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,9 +1,16 @@
+import logging
+import time
+
 from fastapi import APIRouter, HTTPException, Depends
 from bson import ObjectId
 from app.routers.auth import get_current_user
 from app.db.database import db
+from app.core.game_engine import engine, MoveError, get_player_keys, version_filter
+from app.core.game_serializer import serialize_game
+from app.core.websocket_manager import manager
 
 router = APIRouter(prefix="/reward", tags=["reward"])
+logger = logging.getLogger("reward_router")
 
 @router.post("/use", response_model=dict)
 async def use_reward(
@@ -11,36 +18,38 @@ async def use_reward(
     reward_type: str,
     current_user: str = Depends(get_current_user)
 ):
-    game = await db.games.find_one({"_id": ObjectId(game_id)})
+    try:
+        game_id_obj = ObjectId(game_id)
+        game_id_str = str(game_id_obj)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Geçersiz oyun ID formatı.")
+    game = await db.games.find_one({"_id": game_id_obj})
     if not game:
         raise HTTPException(status_code=404, detail="Oyun bulunamadı.")
-    if game["status"] != "active":
-        raise HTTPException(status_code=400, detail="Oyun aktif değil.")
-    if game["player1"] != current_user and game["player2"] != current_user:
-        raise HTTPException(status_code=403, detail="Bu oyuna ait değilsiniz.")
-    me = "player1" if game["player1"] == current_user else "player2"
-    opp = "player2" if me == "player1" else "player1"
-    if reward_type not in game.get("available_rewards", {}).get(me, []):
-        raise HTTPException(status_code=400, detail="Ödül elinizde yok.")
-    updates = {}
-    if reward_type == "bolge_yasagi":
-        updates["region_block"] = me == "player1" and "right" or "left"
-    elif reward_type == "harf_yasagi":
-        opp_hand = game["hands"][opp]
-        frozen = game.get("frozen_letters", {}).get(opp, [])
-        frozen.extend(opp_hand[:2])
-        updates[f"frozen_letters.{opp}"] = frozen
-    elif reward_type == "ekstra_hamle_jokeri":
-        updates["extra_move_in_progress"] = True
-    else:
-        raise HTTPException(status_code=400, detail="Geçersiz reward.")
+    try:
+        result = engine.use_reward(game, current_user, reward_type, time.time())
+    except MoveError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
 
-    rewards = game["available_rewards"][me]
-    rewards.remove(reward_type)
-    updates[f"available_rewards.{me}"] = rewards
+    # Okunan sürümden sonra oyuna başka bir yazma olduysa (ör. aynı oyuncunun eşzamanlı hamlesi) hiçbir şey
+    # yazılmaz; böylece yayınlanan result.state veritabanıyla aynı kalır. Ödül listesi $pull yerine okunan
+    # haliyle karşılaştırılır: $pull aynı türden tüm ödülleri silerdi.
+    player_key, _ = get_player_keys(game, current_user)
+    guard = {
+        "_id": game_id_obj,
+        "status": game["status"],
+        "turn": current_user,
+        f"allAvailableRewards.{player_key}": game["allAvailableRewards"][player_key],
+        **version_filter(game),
+    }
+    update_result = await db.games.update_one(guard, result.update_query())
+    if update_result.matched_count == 0:
+        logger.warning(f"Ödül kullanımı çakıştı: Oyun {game_id_str}, Kullanıcı {current_user}, Ödül {reward_type}")
+        raise HTTPException(status_code=409, detail="Oyun durumu değişti, ödül kullanılamadı. Tekrar deneyin.")
 
-    await db.games.update_one(
-        {"_id": ObjectId(game_id)},
-        {"$set": updates}
-    )
-    return {"message": f"'{reward_type}' kullanıldı.", "updates": updates}
\ No newline at end of file
+    serialized_game = serialize_game(result.state)
+    await manager.broadcast_game_state(game_id_str, serialized_game)
+    for msg in result.notifications:
+        await manager.broadcast_notification(game_id_str, msg, serialized_game["version"])
+    logger.info(f"Ödül kullanıldı: Oyun {game_id_str}, Kullanıcı {current_user}, Ödül {reward_type}")
+    return {"message": f"'{reward_type}' kullanıldı.", "updates": result.updates, "game_state": serialized_game}
@@ -1,29 +1,112 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query
-from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, Query, HTTPException
+from pydantic import ValidationError
+from typing import Any, Dict, Optional
+import json
 import logging
+import time
 
+from app.core.board_wire import negotiate_board_format
+from app.core.frame_codecs import negotiate
+from app.core.game_serializer import GameJSONResponse
 from app.core.websocket_manager import manager
+from app.models.move import MoveRequest, MovePreviewRequest
+from app.models.websocket_models import RpcRequest, RpcResultMessage
+from app.routers import game, reward
+from app.routers.auth import get_current_user
 
 router = APIRouter()
 logger = logging.getLogger("websocket")
 
+@router.get("/ws/stats", response_model=dict)
+async def websocket_stats(current_user: str = Depends(get_current_user)):
+    return manager.stats()
+
+async def _call(request: RpcRequest, game_id: str, username: str) -> Any:
+    # HTTP uçlarıyla aynı fonksiyonlar çağrılır; kimlik zaten soket bağlanırken doğrulandı.
+    params = request.params
+    if request.method == "preview_move":
+        return await game.preview_move(game_id, MovePreviewRequest(**params), current_user=username)
+    if request.method == "make_move":
+        return await game.make_move(game_id, MoveRequest(**params), current_user=username)
+    if request.method == "surrender":
+        return await game.surrender(game_id, current_user=username)
+    return await reward.use_reward(game_id, params.get("reward_type"), current_user=username)
+
+async def handle_rpc(websocket: WebSocket, game_id: str, username: str, data: str):
+    started = time.perf_counter()
+    try:
+        raw = json.loads(data)
+    except ValueError:
+        raw = None
+    if not isinstance(raw, dict) or raw.get("type") != "rpc":
+        # RPC dışındaki mesajlar (canlı tutma vb.) eskisi gibi yok sayılır.
+        logger.debug(f"RPC olmayan mesaj ({username}): {data[:200]}")
+        return
+
+    request_id = raw.get("id")
+    try:
+        request = RpcRequest(**raw)
+        result = await _call(request, game_id, username)
+        if isinstance(result, GameJSONResponse):
+            result = result.content
+        elif hasattr(result, "model_dump"):
+            result = result.model_dump()
+        payload: Dict[str, Any] = {"id": request.id, "ok": True, "result": result}
+    except HTTPException as e:
+        payload = {"id": request_id, "ok": False, "error": {"status": e.status_code, "detail": e.detail}}
+    except (ValidationError, ValueError, TypeError) as e:
+        payload = {"id": request_id, "ok": False, "error": {"status": 422, "detail": str(e)}}
+    except Exception as e:
+        logger.error(f"{game_id} odasında RPC hatası ({username}): {e}", exc_info=True)
+        payload = {"id": request_id, "ok": False, "error": {"status": 500, "detail": "Sunucu hatası."}}
+    logger.debug(f"RPC {raw.get('method')} ({username}) {(time.perf_counter() - started) * 1000:.1f}ms")
+    await manager.send_personal_message(RpcResultMessage(payload=payload), websocket)
+
 @router.websocket("/ws/game/{game_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     game_id: str,
-    token: Optional[str] = Query(None)
+    token: Optional[str] = Query(None),
+    encoding: Optional[str] = Query(None),
+    last_seq: Optional[int] = Query(None),
+    board: Optional[int] = Query(None)
 ):
-    connected = await manager.connect(websocket, game_id, token)
+    # encoding: json (varsayılan), msgpack, deflate veya zstd; ikili kodlamalar binary çerçeve olarak gider.
+    # last_seq: yeniden bağlanırken son görülen sıra; kaçırılanlar (veya tam durum) önce gönderilir.
+    # board=2: seyrek tahta biçimi; verilmezse eski 15x15 grid gönderilir.
+    board_format = negotiate_board_format(websocket.headers.get("accept"), board)
+    connected = await manager.connect(websocket, game_id, token, negotiate(encoding), last_seq, board_format)
     if not connected:
         return
 
+    username = manager.authenticated_users.get(websocket)
     try:
         while True:
+            # {"type": "rpc", "id": ..., "method": ..., "params": {...}}; yanıt rpc_result olarak aynı sokete döner.
             data = await websocket.receive_text()
-            logger.debug(f"Received raw message from {manager.authenticated_users.get(websocket, 'Unknown')}: {data}")
+            await handle_rpc(websocket, game_id, username, data)
 
     except WebSocketDisconnect:
         manager.disconnect(websocket, game_id)
     except Exception as e:
         logger.error(f"{game_id} odasında WebSocket hatası: {e}")
-        manager.disconnect(websocket, game_id)
\ No newline at end of file
+        manager.disconnect(websocket, game_id)
+
+@router.websocket("/ws/lobby")
+async def lobby_endpoint(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None)
+):
+    username = await manager.connect_lobby(websocket, token)
+    if not username:
+        return
+
+    try:
+        while True:
+            # İstemciden yalnızca canlı tutma mesajları beklenir; olaylar sunucudan itilir.
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        manager.disconnect_lobby(websocket, username)
+    except Exception as e:
+        logger.error(f"Lobi WebSocket hatası ({username}): {e}")
+        manager.disconnect_lobby(websocket, username)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from jose import jwt
+
+from app.config import JWT_SECRET_KEY, ALGORITHM
+from app.core import jwt_handler
+from app.core.jwt_handler import create_access_token, verify_token
+
+# get_current_user'daki token doğrulamasının istek başına maliyeti: önbelleksiz (jose.jwt.decode) ve önbellekli.
+
+
+def _bench(label: str, fn, tokens, rounds: int):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for token in tokens:
+            fn(token)
+    elapsed = time.perf_counter() - start
+    calls = rounds * len(tokens)
+    print(f"{label:<12}{elapsed / calls * 1e6:>10.2f} µs/istek  ({calls / elapsed:,.0f} istek/s)")
+    return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JWT doğrulama önbelleği mikro ölçümü")
+    parser.add_argument("--users", type=int, default=200, help="Farklı token sayısı")
+    parser.add_argument("--rounds", type=int, default=50, help="Her token'ın kaç kez sunulacağı")
+    args = parser.parse_args()
+
+    tokens = [create_access_token({"sub": f"oyuncu{i}"}) for i in range(args.users)]
+    uncached = _bench("önbelleksiz", lambda t: jwt.decode(t, JWT_SECRET_KEY, algorithms=[ALGORITHM]), tokens, args.rounds)
+    cached = _bench("önbellekli", verify_token, tokens, args.rounds)
+    print(f"hızlanma: {uncached / cached:.1f}x, {jwt_handler.token_cache_stats()}")
+
+
+if __name__ == "__main__":
+    main()
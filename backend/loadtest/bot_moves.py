@@ -0,0 +1,117 @@
+import random
+from collections import Counter, defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.routers.game_utils import BOARD_SIZE
+
+# Yük testi ve öz-oyun betiklerinin ortak basit botu: sözlükten rafa uyan bir kelime seçer,
+# tahtadaki bir harfi kesecek şekilde yerleştirir. Kelimeyi sunucu/motor yine kendisi doğrular.
+
+CENTER = (BOARD_SIZE // 2, BOARD_SIZE // 2)
+
+Placement = Tuple[List[List[int]], List[str]]
+
+
+def board_cells(board) -> Dict[Tuple[int, int], str]:
+    if isinstance(board, dict) and board.get("v") == 2:
+        return {divmod(idx, board["size"]): letter for idx, letter, _ in board["cells"]}
+    grid = board.get("grid", []) if isinstance(board, dict) else []
+    return {
+        (r, c): cell["letter"]
+        for r, row in enumerate(grid) for c, cell in enumerate(row) if cell.get("letter")
+    }
+
+
+def playable_rack(hand: List[str], frozen: Optional[List[str]]) -> Counter:
+    # Joker atlanır; donmuş harfler elde kaç tane olursa olsun hiç kullanılamaz.
+    banned = {l.upper() for l in frozen or []}
+    return Counter(l for l in hand if l != "JOKER" and l.upper() not in banned)
+
+
+class Vocabulary:
+    # i/ı içeren kelimeler atlanır: büyük harfe çevrilince sunucudaki .lower() ile aynı kelimeye dönmezler.
+    def __init__(self, words, max_len: int, sample: int, rng: random.Random):
+        candidates = sorted(
+            w.upper() for w in words
+            if 2 <= len(w) <= max_len and w.isalpha() and not set(w) & {"i", "ı", "î", "â", "û"}
+        )
+        if sample and len(candidates) > sample:
+            candidates = rng.sample(candidates, sample)
+        self.words = candidates
+        self.letter_sets: Dict[str, frozenset] = {word: frozenset(word) for word in candidates}
+        self.by_letter: Dict[str, List[str]] = defaultdict(list)
+        for word in candidates:
+            for letter in self.letter_sets[word]:
+                self.by_letter[letter].append(word)
+        # Bir kez karıştırılır; harf başına örneklem rastgele başlangıçlı bir pencere olarak alınır.
+        for letter in sorted(self.by_letter):
+            rng.shuffle(self.by_letter[letter])
+
+    @staticmethod
+    def _fits_rack(letters: str, rack: Counter) -> bool:
+        need = Counter(letters)
+        return all(rack[l] >= n for l, n in need.items())
+
+    def first_moves(self, rack: Counter, rng: random.Random) -> Iterator[Placement]:
+        for word in rng.sample(self.words, min(len(self.words), 4000)):
+            if len(word) > 7 or not self._fits_rack(word, rack):
+                continue
+            start = CENTER[1] - rng.randrange(len(word))
+            positions = [[CENTER[0], start + i] for i in range(len(word))]
+            if all(0 <= c < BOARD_SIZE for _, c in positions):
+                yield positions, list(word)
+
+    def cross_moves(self, grid: Dict[Tuple[int, int], str], rack: Counter,
+                    rng: random.Random, attempts: int, per_anchor: int = 60) -> Iterator[Placement]:
+        # Tahtadaki bir harfi dikine kesen, yan yana başka harfe değmeyen kelimeler.
+        anchors = list(grid.items())
+        rng.shuffle(anchors)
+        for (ar, ac), letter in anchors[:attempts]:
+            candidates = self.by_letter.get(letter)
+            if not candidates:
+                continue
+            usable = set(rack) | {letter}
+            start = rng.randrange(len(candidates))
+            for word in (candidates[start:start + per_anchor] + candidates[:max(0, start + per_anchor - len(candidates))]):
+                # Ucuz ön eleme: raf + çapa harfiyle yazılamayan kelimeye yerleşim denenmez.
+                if not self.letter_sets[word] <= usable:
+                    continue
+                offset = word.index(letter)
+                for dr, dc in ((0, 1), (1, 0)):
+                    placed = self._try_place(grid, rack, word, ar - dr * offset, ac - dc * offset, dr, dc)
+                    if placed:
+                        yield placed
+
+    def placements(self, grid: Dict[Tuple[int, int], str], rack: Counter,
+                   rng: random.Random, attempts: int, per_anchor: int = 60) -> Iterator[Placement]:
+        return self.cross_moves(grid, rack, rng, attempts, per_anchor) if grid else self.first_moves(rack, rng)
+
+    def first_move(self, rack: Counter, rng: random.Random) -> Optional[Placement]:
+        return next(self.first_moves(rack, rng), None)
+
+    def cross_move(self, grid: Dict[Tuple[int, int], str], rack: Counter,
+                   rng: random.Random, attempts: int) -> Optional[Placement]:
+        return next(self.cross_moves(grid, rack, rng, attempts), None)
+
+    def _try_place(self, grid, rack: Counter, word: str, r: int, c: int, dr: int, dc: int) -> Optional[Placement]:
+        end_r, end_c = r + dr * (len(word) - 1), c + dc * (len(word) - 1)
+        if r < 0 or c < 0 or end_r >= BOARD_SIZE or end_c >= BOARD_SIZE:
+            return None
+        if (r - dr, c - dc) in grid or (end_r + dr, end_c + dc) in grid:
+            return None
+        positions, letters = [], []
+        for i, letter in enumerate(word):
+            cell = (r + dr * i, c + dc * i)
+            existing = grid.get(cell)
+            if existing is not None:
+                if existing != letter:
+                    return None
+                continue
+            # Yeni harfin yanları boş olmalı; yoksa ikinci bir (muhtemelen geçersiz) kelime oluşur.
+            if (cell[0] + dc, cell[1] + dr) in grid or (cell[0] - dc, cell[1] - dr) in grid:
+                return None
+            positions.append([cell[0], cell[1]])
+            letters.append(letter)
+        if not positions or not self._fits_rack("".join(letters), rack):
+            return None
+        return positions, letters
@@ -0,0 +1,366 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.board_wire import SPARSE_MEDIA_TYPE
+from app.core.stats import percentile, to_ms
+from app.routers.game_utils import WORD_LIST
+from loadtest.bot_moves import Vocabulary, board_cells, playable_rack
+
+# Uçtan uca yük testi: sanal oyuncular kayıt olur, /game/queue ile eşleşir, /ws/game/{id}'ye bağlanır,
+# önizleme + hamle yapar ve belli bir hamle sayısından sonra teslim olur. Uygulama aynı süreçte ASGI
+# üzerinden sürülür (ağ yok); veritabanı olarak mongomock_motor (bellek içi) veya gerçek bir Mongo kullanılır.
+# Rapor: uç nokta başına istek/s ve p50/p95/p99, WebSocket teslim gecikmesi, olay döngüsü gecikmesi.
+
+class ASGIWebSocket:
+    # Uygulamanın websocket kapsamını kuyruklarla süren küçük bir istemci.
+    def __init__(self, app, path: str, query: str = ""):
+        self._app = app
+        self._scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+            "path": path, "raw_path": path.encode(), "root_path": "", "query_string": query.encode(),
+            "headers": [(b"host", b"loadtest")], "client": ("127.0.0.1", 0), "server": ("loadtest", 80),
+            "subprotocols": [],
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def connect(self) -> bool:
+        self._task = asyncio.create_task(self._app(self._scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        return message["type"] == "websocket.accept"
+
+    async def receive(self) -> Optional[str]:
+        message = await self._from_app.get()
+        if message["type"] == "websocket.send":
+            return message.get("text") if message.get("text") is not None else message.get("bytes")
+        return None
+
+    async def send_text(self, text: str):
+        await self._to_app.put({"type": "websocket.receive", "text": text})
+
+    async def close(self):
+        await self._to_app.put({"type": "websocket.disconnect", "code": 1000})
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, Exception):
+                self._task.cancel()
+
+
+class Lifespan:
+    def __init__(self, app):
+        self._app = app
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+        self._task = asyncio.create_task(self._app(scope, self._to_app.get, self._from_app.put))
+        await self._to_app.put({"type": "lifespan.startup"})
+        message = await self._from_app.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(f"Uygulama başlatılamadı: {message}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._to_app.put({"type": "lifespan.shutdown"})
+        await self._from_app.get()
+        await self._task
+
+
+class Metrics:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.delivery: List[float] = []
+        self.loop_lag: List[float] = []
+        self.outcomes: Counter = Counter()
+        # Oyun başına: son hamle isteğinin gönderilme anı; rakibin state_update'i gelince ölçülür.
+        self.pending_moves: Dict[str, Tuple[str, float]] = {}
+
+    def record(self, endpoint: str, seconds: float, status: int):
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def move_sent(self, game_id: str, mover: str):
+        self.pending_moves[game_id] = (mover, time.perf_counter())
+
+    def state_received(self, game_id: str, receiver: str):
+        pending = self.pending_moves.get(game_id)
+        if pending and pending[0] != receiver:
+            del self.pending_moves[game_id]
+            self.delivery.append(time.perf_counter() - pending[1])
+
+
+async def _monitor_loop_lag(metrics: Metrics, interval: float, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        metrics.loop_lag.append(max(0.0, time.perf_counter() - started - interval))
+
+
+class Harness:
+    def __init__(self, app, args, vocabulary: Vocabulary, metrics: Metrics):
+        import httpx
+        self.app = app
+        self.args = args
+        self.vocabulary = vocabulary
+        self.metrics = metrics
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+        self.finished_games = 0
+        self.move_counts: Counter = Counter()
+
+    async def request(self, endpoint: str, method: str, path: str, token: Optional[str] = None,
+                      headers: Optional[Dict[str, str]] = None, **kwargs):
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        started = time.perf_counter()
+        response = await self.client.request(method, path, headers=headers, **kwargs)
+        self.metrics.record(endpoint, time.perf_counter() - started, response.status_code)
+        return response
+
+    async def player(self, index: int, run_id: str):
+        rng = random.Random(self.args.seed * 100003 + index)
+        username = f"lt{run_id}{index}"
+        password = "Yuk1testi"
+        await self.request("register", "POST", "/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": password,
+        })
+        response = await self.request("login", "POST", "/auth/login", json={"username": username, "password": password})
+        token = response.json()["access_token"]
+
+        lobby = ASGIWebSocket(self.app, "/ws/lobby", f"token={token}")
+        if not await lobby.connect():
+            self.metrics.outcomes["lobby_rejected"] += 1
+            return
+        try:
+            response = await self.request("queue", "POST", "/game/queue", token, json={"time_option": self.args.time_option})
+            game_id = response.json().get("game_id")
+            while not game_id:
+                text = await asyncio.wait_for(lobby.receive(), timeout=self.args.match_timeout)
+                if text is None:
+                    return
+                message = json.loads(text)
+                payload = message.get("payload") or {}
+                if message.get("type") == "lobby_event" and payload.get("event") == "match_found":
+                    game_id = payload["game_id"]
+        except asyncio.TimeoutError:
+            self.metrics.outcomes["match_timeout"] += 1
+            await self.request("leave_queue", "DELETE", "/game/queue", token)
+            return
+        finally:
+            await lobby.close()
+
+        await self.play(game_id, username, token, rng)
+
+    async def play(self, game_id: str, username: str, token: str, rng: random.Random):
+        ws = ASGIWebSocket(self.app, f"/ws/game/{game_id}", f"token={token}&board=2")
+        if not await ws.connect():
+            self.metrics.outcomes["game_ws_rejected"] += 1
+            return
+        try:
+            # Sokete bağlanmadan önceki durum yayınlanmaz; ilk durum detay uç noktasından alınır.
+            detail = await self.request(
+                "detail", "GET", f"/game/detail/{game_id}", token, headers={"Accept": SPARSE_MEDIA_TYPE}
+            )
+            state = detail.json()
+            while True:
+                if str(state.get("status", "")).startswith("finished"):
+                    if username == state.get("player1_username"):
+                        self.metrics.outcomes[state["status"]] += 1
+                    break
+                if state.get("turn") == username:
+                    await self.take_turn(game_id, username, token, state, rng)
+                state = await self._next_state(ws, game_id, username)
+                if state is None:
+                    break
+        except asyncio.TimeoutError:
+            self.metrics.outcomes["turn_timeout"] += 1
+        finally:
+            await ws.close()
+
+    async def _next_state(self, ws: ASGIWebSocket, game_id: str, username: str) -> Optional[Dict]:
+        while True:
+            text = await asyncio.wait_for(ws.receive(), timeout=self.args.turn_timeout)
+            if text is None:
+                return None
+            message = json.loads(text)
+            if message.get("type") == "state_update":
+                self.metrics.state_received(game_id, username)
+                return message["payload"]
+
+    async def take_turn(self, game_id: str, username: str, token: str, state: Dict, rng: random.Random):
+        if self.move_counts[game_id] >= self.args.moves:
+            self.metrics.move_sent(game_id, username)
+            await self.request("surrender", "POST", f"/game/surrender/{game_id}", token)
+            return
+        self.move_counts[game_id] += 1
+
+        rack = playable_rack(state.get("hands", {}).get(username, []), state.get("frozen_letters", {}).get(username))
+        grid = board_cells(state.get("board"))
+        placement = (
+            self.vocabulary.cross_move(grid, rack, rng, self.args.anchor_attempts)
+            if grid else self.vocabulary.first_move(rack, rng)
+        )
+
+        if placement:
+            positions, letters = placement
+            preview = await self.request(
+                "preview_move", "POST", f"/game/{game_id}/preview_move", token,
+                json={"positions": positions, "used_letters": letters},
+            )
+            if preview.status_code == 200 and preview.json().get("is_valid"):
+                self.metrics.move_sent(game_id, username)
+                response = await self.request(
+                    "move", "POST", f"/game/move/{game_id}", token,
+                    json={"move_type": "place_word", "positions": positions, "used_letters": letters},
+                )
+                if response.status_code == 200:
+                    self.metrics.outcomes["word_placed"] += 1
+                    return
+                self.metrics.outcomes["move_rejected"] += 1
+            else:
+                self.metrics.outcomes["preview_invalid"] += 1
+
+        self.metrics.move_sent(game_id, username)
+        response = await self.request(
+            "pass", "POST", f"/game/move/{game_id}", token,
+            json={"move_type": "place_word", "pass_move": True},
+        )
+        self.metrics.outcomes["passed" if response.status_code == 200 else "pass_rejected"] += 1
+
+
+def _summary(samples: List[float]) -> Dict[str, Optional[float]]:
+    return {
+        "p50": to_ms(percentile(samples, 50)),
+        "p95": to_ms(percentile(samples, 95)),
+        "p99": to_ms(percentile(samples, 99)),
+        "max": to_ms(max(samples)) if samples else None,
+    }
+
+
+def _use_memory_mongo():
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        sys.exit("--mongo memory için mongomock-motor gerekli (pip install mongomock-motor) ya da --mongo <uri> verin.")
+    from app import config
+    from app.db import database
+    database.client = AsyncMongoMockClient()
+    database.db = database.client[config.DATABASE_NAME]
+
+
+async def run(args) -> Dict:
+    from app import config
+    config.BCRYPT_ROUNDS = args.bcrypt_rounds
+    if args.mongo == "memory":
+        _use_memory_mongo()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from app.db import database
+        database.client = AsyncIOMotorClient(args.mongo)
+        database.db = database.client[args.database]
+        await database.client.drop_database(args.database)
+
+    from app.main import app
+
+    metrics = Metrics()
+    vocabulary = Vocabulary(WORD_LIST, args.max_word_len, args.vocabulary, random.Random(args.seed))
+    run_id = uuid.uuid4().hex[:6]
+    stop = asyncio.Event()
+
+    async with Lifespan(app):
+        harness = Harness(app, args, vocabulary, metrics)
+        monitor = asyncio.create_task(_monitor_loop_lag(metrics, args.lag_interval, stop))
+        started = time.perf_counter()
+        tasks = []
+        for i in range(args.players):
+            tasks.append(asyncio.create_task(harness.player(i, run_id)))
+            if args.ramp:
+                await asyncio.sleep(args.ramp / args.players)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await monitor
+        await harness.client.aclose()
+
+    for result in results:
+        if isinstance(result, Exception):
+            metrics.outcomes[f"error:{type(result).__name__}"] += 1
+
+    total_requests = sum(len(v) for v in metrics.latencies.values())
+    return {
+        "players": args.players,
+        "elapsed_s": round(elapsed, 3),
+        "requests": total_requests,
+        "requests_per_s": round(total_requests / elapsed, 1) if elapsed else None,
+        "endpoints": {
+            name: {
+                "count": len(samples),
+                "per_s": round(len(samples) / elapsed, 1) if elapsed else None,
+                "statuses": dict(metrics.statuses[name]),
+                **_summary(samples),
+            }
+            for name, samples in sorted(metrics.latencies.items())
+        },
+        "ws_delivery_ms": {"count": len(metrics.delivery), **_summary(metrics.delivery)},
+        "loop_lag_ms": {"count": len(metrics.loop_lag), **_summary(metrics.loop_lag)},
+        "outcomes": dict(metrics.outcomes),
+    }
+
+
+def _print_report(report: Dict):
+    print(f"{report['players']} oyuncu, {report['elapsed_s']}s, {report['requests']} istek ({report['requests_per_s']} istek/s)")
+    print(f"{'uç nokta':<16}{'adet':>8}{'istek/s':>10}{'p50':>10}{'p95':>10}{'p99':>10}  durumlar")
+    for name, row in report["endpoints"].items():
+        print(f"{name:<16}{row['count']:>8}{row['per_s']:>10}{row['p50']:>10}{row['p95']:>10}{row['p99']:>10}  {row['statuses']}")
+    for label, key in (("ws teslim", "ws_delivery_ms"), ("döngü gecikmesi", "loop_lag_ms")):
+        row = report[key]
+        print(f"{label:<16}{row['count']:>8}{'':>10}{row['p50']!s:>10}{row['p95']!s:>10}{row['p99']!s:>10}  max {row['max']}")
+    print(f"sonuçlar: {report['outcomes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sanal oyuncularla uçtan uca yük testi")
+    parser.add_argument("--players", type=int, default=20, help="Sanal oyuncu sayısı (çift olmalı)")
+    parser.add_argument("--moves", type=int, default=10, help="Oyun başına hamle; sonra sıradaki oyuncu teslim olur")
+    parser.add_argument("--ramp", type=float, default=0.0, help="Oyuncuların bu kadar saniyeye yayılarak başlatılması")
+    parser.add_argument("--time-option", default="12h")
+    parser.add_argument("--mongo", default="memory", help="'memory' (mongomock_motor) veya Mongo URI")
+    parser.add_argument("--database", default="kelime_mayinlari_loadtest", help="URI verildiğinde kullanılan (ve silinen) veritabanı")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4, help="Kayıt/girişin testi domine etmemesi için düşük maliyet")
+    parser.add_argument("--vocabulary", type=int, default=20000, help="İstemcinin kullandığı kelime örneklemi")
+    parser.add_argument("--max-word-len", type=int, default=6)
+    parser.add_argument("--anchor-attempts", type=int, default=25)
+    parser.add_argument("--match-timeout", type=float, default=30.0)
+    parser.add_argument("--turn-timeout", type=float, default=60.0)
+    parser.add_argument("--lag-interval", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Raporu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    report = asyncio.run(run(args))
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.frame_codecs import CODECS, CodecStats, FrameEncoder
+from app.routers.game_utils import (
+    generate_letter_pool,
+    deal_letters,
+    assign_solid_bonuses,
+    assign_mines_and_rewards,
+)
+
+# Bir oyun boyunca her hamlede gönderilen state_update mesajını her kodlamayla kodlar,
+# hamle başına bayt ve kodlama süresini raporlar. msgpack/zstd kurulu değilse atlanır.
+
+
+def _game_messages(moves: int, rng: random.Random) -> list:
+    pool = generate_letter_pool()
+    board_grid = [[{"letter": None, "special": None, "original_tile": None} for _ in range(15)] for _ in range(15)]
+    assign_solid_bonuses(board_grid)
+    assign_mines_and_rewards(board_grid)
+    hands = {"oyuncu1": deal_letters(pool, 7, rng), "oyuncu2": deal_letters(pool, 7, rng)}
+    scores = {"player1": 0, "player2": 0}
+    messages = []
+    r, c = 7, 4
+    for move in range(moves):
+        # Basit bir yerleştirme: harfler tahtaya satır satır dolar.
+        for _ in range(rng.randint(2, 5)):
+            letter = pool.draw_one(rng) if pool else "A"
+            board_grid[r][c]["letter"] = letter
+            board_grid[r][c]["original_tile"] = letter
+            c += 1
+            if c >= 15:
+                r, c = (r + 1) % 15, 0
+        scores["player1" if move % 2 == 0 else "player2"] += rng.randint(4, 30)
+        payload = {
+            "game_id": "6650f1d2c3b4a59687a1b2c3",
+            "player1_username": "oyuncu1",
+            "player2_username": "oyuncu2",
+            "board": {"grid": board_grid},
+            "hands": hands,
+            "pool": pool.to_letters(),
+            "pool_remaining": pool.remaining,
+            "status": "active",
+            "turn": "oyuncu2" if move % 2 == 0 else "oyuncu1",
+            "scores": dict(scores),
+            "timeOption": "5m",
+            "lastMoveTime": time.time(),
+            "deadline": time.time() + 300,
+        }
+        messages.append(json.dumps({"type": "state_update", "payload": payload}, ensure_ascii=False))
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket çerçeve kodlamalarının bayt/CPU karşılaştırması")
+    parser.add_argument("--moves", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=50, help="Her mesajın kaç kez kodlanacağı")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    messages = _game_messages(args.moves, random.Random(args.seed))
+    json_bytes = sum(len(m.encode()) for m in messages) / len(messages)
+    print(f"hamle={args.moves} tekrar={args.repeat} kodlamalar={', '.join(CODECS)}")
+    print(f"{'kodlama':<10}{'bayt/hamle':>12}{'oran':>8}{'µs/kodlama':>12}")
+    for codec in CODECS:
+        stats = {}
+        for _ in range(args.repeat):
+            for text in messages:
+                FrameEncoder(text, stats).get(codec)
+        stat: CodecStats = stats[codec]
+        summary = stat.to_dict()
+        print(f"{codec:<10}{summary['avg_bytes']:>12}{summary['avg_bytes'] / json_bytes:>8.2f}{summary['avg_encode_us']:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+from typing import Callable, Dict, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+from app.core.game_serializer import serialize_game
+from app.core.game_setup_pool import build_game_setup, stamp_players
+from app.routers import game_utils
+from app.routers.game_utils import (
+    WORD_LIST,
+    KELIME_LISTESI_PATH,
+    load_word_list,
+    find_all_formed_words,
+    trace_word_in_line,
+    calculate_word_score,
+    apply_mine_and_reward_effects,
+    touches_existing_letter,
+    is_valid_word,
+)
+
+# game_utils sıcak yolları için mikro ölçümler. Tahtalar sabit tohumla oynanmış oyunlardan üretilir
+# (boş, oyun ortası, dolu); sonuçlar JSON'a yazılır, --compare ile önceki bir çalıştırmayla karşılaştırılır.
+
+FIXTURE_WORDS = {"empty": 1, "midgame": 12, "full": 45}
+
+
+def _place_word(grid, word: str, r: int, c: int, dr: int, dc: int) -> List[List[int]]:
+    placed = []
+    for i, letter in enumerate(word):
+        cell = grid[r + dr * i][c + dc * i]
+        if cell["letter"] is None:
+            cell["letter"] = letter
+            cell["original_tile"] = letter
+            placed.append([r + dr * i, c + dc * i])
+    return placed
+
+
+def _fits(grid, word: str, r: int, c: int, dr: int, dc: int) -> bool:
+    end_r, end_c = r + dr * (len(word) - 1), c + dc * (len(word) - 1)
+    if not (0 <= r and 0 <= c and end_r < 15 and end_c < 15):
+        return False
+    new_cells = 0
+    for i, letter in enumerate(word):
+        existing = grid[r + dr * i][c + dc * i]["letter"]
+        if existing is None:
+            new_cells += 1
+        elif existing != letter:
+            return False
+    return new_cells > 0
+
+
+def _seeded_game(words: int, seed: int) -> Tuple[Dict, List[List[int]]]:
+    # Basit bir oyun: ilk kelime merkezden, sonrakiler tahtadaki bir harfi çapraz keserek yerleşir.
+    random.seed(seed)
+    rng = random.Random(seed)
+    game = stamp_players(build_game_setup(), "oyuncu1", "oyuncu2", "5m")
+    game["_id"] = ObjectId()
+    grid = game["board"]["grid"]
+    vocabulary = sorted(w.upper() for w in WORD_LIST if 3 <= len(w) <= 7)
+    first = rng.choice([w for w in vocabulary if len(w) == 5])
+    last_move = _place_word(grid, first, 7, 5, 0, 1)
+    anchors = [(7, 5 + i, 0, 1) for i in range(len(first))]
+    placed_words = 1
+    attempts = 0
+    while placed_words < words and attempts < words * 200:
+        attempts += 1
+        ar, ac, adr, adc = rng.choice(anchors)
+        dr, dc = adc, adr
+        letter = grid[ar][ac]["letter"]
+        word = rng.choice(vocabulary)
+        if letter not in word:
+            continue
+        offset = word.index(letter)
+        r, c = ar - dr * offset, ac - dc * offset
+        if not _fits(grid, word, r, c, dr, dc):
+            continue
+        last_move = _place_word(grid, word, r, c, dr, dc)
+        anchors.extend((pr, pc, dr, dc) for pr, pc in last_move)
+        placed_words += 1
+    game["scores"] = {"player1": rng.randint(50, 300), "player2": rng.randint(50, 300)}
+    return game, last_move
+
+
+def _cases(seed: int) -> Dict[str, Callable[[], object]]:
+    cases: Dict[str, Callable[[], object]] = {}
+    for name, words in FIXTURE_WORDS.items():
+        game, move = _seeded_game(words, seed)
+        grid = game["board"]["grid"]
+        placed_set = {tuple(p) for p in move}
+        formed, _, _ = find_all_formed_words(grid, move)
+        main_word = formed[0]["tiles"] if formed else None
+        r0, c0 = move[0]
+        horizontal = len(move) < 2 or move[0][0] == move[1][0]
+        dr, dc = (0, 1) if horizontal else (1, 0)
+        tiles = trace_word_in_line(grid, r0, c0, dr, dc)
+        placed_info = [{"row": r, "col": c, "letter": grid[r][c]["letter"]} for r, c in move]
+        word = "".join(t["letter"] for t in tiles).lower()
+
+        cases[f"find_all_formed_words[{name}]"] = lambda g=grid, m=move: find_all_formed_words(g, m)
+        cases[f"trace_word_in_line[{name}]"] = lambda g=grid, r=r0, c=c0, a=dr, b=dc: trace_word_in_line(g, r, c, a, b)
+        cases[f"calculate_word_score[{name}]"] = lambda g=grid, t=main_word or tiles, p=placed_set: calculate_word_score(g, t, p)
+        cases[f"apply_mine_and_reward_effects[{name}]"] = (
+            lambda g=game, p=placed_info: apply_mine_and_reward_effects(g, p, 20, "player1", "player2", 0.0)
+        )
+        cases[f"touches_existing_letter[{name}]"] = lambda g=grid, m=move, f=(words == 1): touches_existing_letter(g, m, f)
+        cases[f"is_valid_word[{name}]"] = lambda w=word: is_valid_word(w)
+        cases[f"serialize_game_data[{name}]"] = lambda g=game: serialize_game(g)
+    return cases
+
+
+def _measure(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(runs) * 1e6, 3),
+        "min_us": round(min(runs) * 1e6, 3),
+        "number": number,
+    }
+
+
+def _commit() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="game_utils mikro ölçüm paketi")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--filter", default="", help="Sadece adı bu metni içeren ölçümler")
+    parser.add_argument("--output", default="game_utils_bench.json")
+    parser.add_argument("--compare", help="Karşılaştırılacak önceki sonuç dosyası")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Gerileme eşiği (%%)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    results: Dict[str, Dict[str, float]] = {}
+    if KELIME_LISTESI_PATH.is_file() and args.filter in "load_word_list":
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            load_word_list(KELIME_LISTESI_PATH)
+        per_load = round((time.perf_counter() - start) / args.repeat * 1e6, 3)
+        results["load_word_list"] = {"median_us": per_load, "min_us": per_load, "number": 1}
+
+    for name, fn in _cases(args.seed).items():
+        if args.filter in name:
+            results[name] = _measure(fn, args.repeat)
+
+    report = {
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "timestamp": time.time(),
+        "seed": args.seed,
+        "words": len(game_utils.WORD_LIST),
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    previous = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            previous = json.load(f).get("results", {})
+
+    regressions = []
+    for name, result in results.items():
+        line = f"{name:<50}{result['median_us']:>12.2f} µs"
+        before = previous.get(name)
+        if before:
+            # En iyi tur karşılaştırılır; medyan paylaşımlı makinelerde daha gürültülü.
+            change = (result["min_us"] - before["min_us"]) / before["min_us"] * 100
+            line += f"  {change:+6.1f}%"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  GERİLEME"
+        print(line)
+    print(f"sonuçlar: {args.output} (commit {report['commit']})")
+    if regressions:
+        print(f"{len(regressions)} ölçümde %{args.threshold:g} üzeri gerileme")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.config import MONGODB_URI
+from app.core.matchmaking import MongoMatchmakingBackend, MATCHED, QUEUED, ALREADY_QUEUED
+
+# Birden fazla süreç aynı Mongo kuyruğuna eşzamanlı girer; her oyuncunun en fazla bir
+# eşleşmede yer aldığı ve kuyrukta her süre için en fazla bir kişinin kaldığı doğrulanır.
+# Ortak kullanıcılar her süreçten aynı anda sıraya sokulur; kimseyle eşleşemeyecek kadar uzak
+# puanlarıyla kuyrukta tam bir biletleri kalmalıdır.
+# --mongo memory: gerçek Mongo yoksa worker'lar tek süreçte görev olarak ortak bir mongomock_motor
+# istemcisini kullanır; her çağrı öncesi rastgele gecikmeyle istekleri iç içe geçer.
+
+SHARED_RATING_BASE = 10000.0
+SHARED_RATING_STEP = 2000.0
+JITTERED_CALLS = frozenset({"insert_one", "find_one", "find_one_and_update", "update_one", "delete_one"})
+
+_memory_client = None
+
+
+class _Jittered:
+    # Bellek içi Mongo çağrıları olay döngüsüne dönmez; gecikme olmadan eşzamanlı istekler hiç çakışmaz.
+    def __init__(self, collection, max_delay: float):
+        self._collection = collection
+        self._max_delay = max_delay
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in JITTERED_CALLS:
+            return attr
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(random.random() * self._max_delay)
+            return await attr(*args, **kwargs)
+        return call
+
+
+def _connect(mongo: str):
+    global _memory_client
+    if mongo != "memory":
+        return AsyncIOMotorClient(mongo)
+    if _memory_client is None:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--mongo memory için mongomock-motor gerekli (pip install mongomock-motor) ya da --mongo <uri> verin.")
+        _memory_client = AsyncMongoMockClient()
+    return _memory_client
+
+
+def _close(client):
+    if client is not _memory_client:
+        client.close()
+
+
+def _shared_user(i: int) -> str:
+    return f"shared_u{i}"
+
+
+def _backend(client, database_name: str, latency: float = 0.0) -> MongoMatchmakingBackend:
+    queue, members = client[database_name].matchmaking_queue, client[database_name].queue_members
+    if latency:
+        queue, members = _Jittered(queue, latency), _Jittered(members, latency)
+    return MongoMatchmakingBackend(queue, members)
+
+
+async def _worker(worker_id: int, users_per_worker: int, shared_users: int, time_options,
+                  mongo: str, database_name: str, concurrency: int, latency: float = 0.0):
+    client = _connect(mongo)
+    backend = _backend(client, database_name, latency)
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def one(i: int):
+        username = f"w{worker_id}_u{i}"
+        time_option = time_options[i % len(time_options)]
+        async with semaphore:
+            outcome, ticket = await backend.enqueue(username, time_option)
+        results.append((username, time_option, outcome, ticket.username if ticket else None))
+
+    async def shared(i: int):
+        time_option = time_options[i % len(time_options)]
+        async with semaphore:
+            outcome, _ = await backend.enqueue(_shared_user(i), time_option, SHARED_RATING_BASE + i * SHARED_RATING_STEP)
+        results.append((_shared_user(i), time_option, outcome, None))
+
+    await asyncio.gather(*(one(i) for i in range(users_per_worker)), *(shared(i) for i in range(shared_users)))
+    _close(client)
+    return results
+
+
+def _run_worker(args):
+    return asyncio.run(_worker(*args))
+
+
+async def _run_in_process(worker_args):
+    return await asyncio.gather(*(_worker(*a) for a in worker_args))
+
+
+async def _reset(mongo: str, database_name: str):
+    client = _connect(mongo)
+    await client[database_name].matchmaking_queue.delete_many({})
+    await client[database_name].queue_members.delete_many({})
+    _close(client)
+
+
+async def _sweep_and_leftover(mongo: str, database_name: str):
+    # Eşzamanlı girişlerde aynı anda sıraya düşen uygun çiftleri arka plan taraması eşleştirir.
+    client = _connect(mongo)
+    backend = _backend(client, database_name)
+    swept = []
+    while True:
+        pairs = await backend.pair_waiting()
+        if not pairs:
+            break
+        swept.extend((a.username, b.username) for a, b in pairs)
+    docs = await client[database_name].matchmaking_queue.find({}).to_list(None)
+    members = {doc["_id"] async for doc in client[database_name].queue_members.find({}, projection={"_id": 1})}
+    _close(client)
+    leftover = {}
+    for doc in docs:
+        leftover.setdefault(doc["time_option"], []).extend(t["username"] for t in doc.get("tickets", []))
+    return swept, leftover, members
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Süreçler arası eşleştirme doğruluk/yük testi")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--users", type=int, default=500, help="Süreç başına kullanıcı sayısı")
+    parser.add_argument("--concurrency", type=int, default=64, help="Süreç başına eşzamanlı istek")
+    parser.add_argument("--shared-users", type=int, default=20, help="Her süreçten aynı anda sıraya girilen ortak kullanıcı sayısı")
+    parser.add_argument("--time-options", default="2m,5m")
+    parser.add_argument("--mongo", default=MONGODB_URI, help="Mongo URI veya 'memory' (mongomock_motor, tek süreç)")
+    parser.add_argument("--database", default="kelime_mayinlari_loadtest")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="--mongo memory: çağrı başına en fazla yapay gecikme")
+    args = parser.parse_args()
+    time_options = tuple(args.time_options.split(","))
+    memory = args.mongo == "memory"
+    worker_args = [
+        (w, args.users, args.shared_users, time_options, args.mongo, args.database, args.concurrency,
+         args.latency_ms / 1000.0 if memory else 0.0)
+        for w in range(args.processes)
+    ]
+
+    asyncio.run(_reset(args.mongo, args.database))
+    start = time.perf_counter()
+    if memory:
+        per_worker = asyncio.run(_run_in_process(worker_args))
+    else:
+        with multiprocessing.Pool(args.processes) as pool:
+            per_worker = pool.map(_run_worker, worker_args)
+    elapsed = time.perf_counter() - start
+
+    results = [r for worker in per_worker for r in worker]
+    shared = {_shared_user(i) for i in range(args.shared_users)}
+    errors = []
+    for user in sorted(shared):
+        outcomes = Counter(outcome for u, _, outcome, _ in results if u == user)
+        if outcomes[QUEUED] != 1 or outcomes[ALREADY_QUEUED] != args.processes - 1:
+            errors.append(f"{user} için beklenmeyen sonuçlar: {dict(outcomes)}")
+    results = [r for r in results if r[0] not in shared]
+    pairs = [(user, opponent) for user, _, outcome, opponent in results if outcome == MATCHED]
+    queued = {user for user, _, outcome, _ in results if outcome == QUEUED}
+    option_of = {user: opt for user, opt, _, _ in results}
+
+    appearances = Counter()
+    for user, opponent in pairs:
+        appearances[user] += 1
+        appearances[opponent] += 1
+        if opponent not in queued:
+            errors.append(f"{user} sırada olmayan {opponent} ile eşleşti")
+        if option_of[user] != option_of[opponent]:
+            errors.append(f"{user} ve {opponent} farklı sürelerde eşleşti")
+    reported = {(user, n) for user, n in appearances.items() if n > 1}
+    errors.extend(f"{user} {n} kez eşleşti" for user, n in reported)
+
+    swept, leftover, members = asyncio.run(_sweep_and_leftover(args.mongo, args.database))
+    waiting_users = [user for users in leftover.values() for user in users]
+    for user in sorted(shared):
+        if waiting_users.count(user) != 1:
+            errors.append(f"{user} kuyrukta {waiting_users.count(user)} biletle kaldı")
+    if members != set(waiting_users):
+        errors.append(f"kuyruk üyelikleri biletlerle uyuşmuyor: {sorted(members ^ set(waiting_users))[:5]}")
+    leftover = {opt: [u for u in users if u not in shared] for opt, users in leftover.items()}
+    for waiting, other in swept:
+        appearances[waiting] += 1
+        appearances[other] += 1
+        if option_of[waiting] != option_of[other]:
+            errors.append(f"{waiting} ve {other} farklı sürelerde eşleşti")
+    errors.extend(f"{user} {n} kez eşleşti" for user, n in appearances.items() if n > 1 and (user, n) not in reported)
+    for opt, users in leftover.items():
+        if len(users) > 1:
+            errors.append(f"{opt} kuyruğunda {len(users)} kişi eşleşmeden kaldı: {users[:5]}")
+        for user in users:
+            if user in appearances:
+                errors.append(f"{user} hem eşleşti hem kuyrukta kaldı")
+    unaccounted = [u for u in option_of if u not in appearances and not any(u in v for v in leftover.values())]
+    errors.extend(f"{user} kayboldu" for user in unaccounted)
+
+    total = len(results)
+    print(f"süreç={args.processes} kullanıcı={total} eşleşme={len(pairs)} taramada={len(swept)} kalan={sum(len(v) for v in leftover.values())}")
+    print(f"süre={elapsed:.2f}s, {total / elapsed:.0f} enqueue/s")
+    if errors:
+        print(f"HATA ({len(errors)}):")
+        for e in errors[:20]:
+            print(f"  {e}")
+        sys.exit(1)
+    print("Tüm oyuncular doğru eşleşti.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from statistics import mean
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.game_engine import GameEngine, MoveError, MoveResult
+from app.core.game_setup_pool import build_game_setup, stamp_players
+from app.core.stats import percentile
+from app.models.move import MoveRequest
+from app.routers import game_utils
+from app.routers.game_utils import WORD_LIST
+from loadtest.bot_moves import Vocabulary, board_cells, playable_rack
+
+# Denge ayarı için bot-bot öz-oyun: tohumlu oyunlar süreç havuzunda, tamamen bellekte GameEngine ile
+# oynanır (veritabanı/ağ yok). --mine/--reward/--letter ile MINE_TYPES_COUNT, REWARD_TYPES_COUNT ve
+# LETTER_DISTRIBUTION her worker'da geçersiz kılınır; aynı tohumlar farklı ayarlarla karşılaştırılabilir.
+# Rapor: skor dağılımları, oyun uzunluğu, mayın/ödül tetiklenme oranları, puan_transferi büyüklüğü,
+# ilk oyuncu avantajı. Oyunlar birbirinden bağımsız olduğundan verim çekirdek sayısıyla doğrusal artar.
+
+PLAYERS = ("player1", "player2")
+PASS = MoveRequest(move_type="place_word", pass_move=True)
+
+_vocabulary: Optional[Vocabulary] = None
+_settings: Dict = {}
+
+
+def apply_overrides(mines: Dict[str, int], rewards: Dict[str, int], letters: Dict[str, int]):
+    # game_utils modül değişkenleri çağrı anında okunduğundan yerinde değiştirmek yeterli.
+    game_utils.MINE_TYPES_COUNT.update(mines)
+    game_utils.REWARD_TYPES_COUNT.update(rewards)
+    game_utils.TOTAL_MINES = sum(game_utils.MINE_TYPES_COUNT.values())
+    game_utils.TOTAL_REWARDS = sum(game_utils.REWARD_TYPES_COUNT.values())
+    game_utils.MINE_POOL = [m for m, n in game_utils.MINE_TYPES_COUNT.items() for _ in range(n)]
+    game_utils.REWARD_POOL = [r for r, n in game_utils.REWARD_TYPES_COUNT.items() for _ in range(n)]
+    for letter, count in letters.items():
+        game_utils.LETTER_DISTRIBUTION[letter]["count"] = count
+    game_utils.FULL_POOL_COUNTS = tuple(
+        game_utils.LETTER_DISTRIBUTION[letter]["count"] for letter in game_utils.LETTER_KINDS
+    )
+
+
+def _init_worker(settings: Dict):
+    global _vocabulary, _settings
+    logging.disable(logging.WARNING)
+    apply_overrides(settings["mines"], settings["rewards"], settings["letters"])
+    _settings = settings
+    if _vocabulary is None:
+        _vocabulary = Vocabulary(WORD_LIST, settings["max_word_len"], 0, random.Random(0))
+
+
+def _best_move(engine: GameEngine, game: Dict, username: str, now: float, rng: random.Random) -> Optional[MoveResult]:
+    # En fazla --candidates geçerli yerleşim denenir; mayınlar bot için görünmez olduğundan
+    # mayın öncesi puanı en yüksek olan seçilir.
+    rack = playable_rack(game["hands"][username], game.get("frozen_letters", {}).get(username))
+    placements = _vocabulary.placements(board_cells(game["board"]), rack, rng, _settings["anchor_attempts"], _settings["words_per_anchor"])
+    best, best_score, tried = None, -1, 0
+    for positions, letters in placements:
+        tried += 1
+        try:
+            result = engine.apply(game, username, MoveRequest(move_type="place_word", positions=positions, used_letters=letters), now)
+        except MoveError:
+            result = None
+        if result is not None and result.events[0]["score_before_mines"] > best_score:
+            best, best_score = result, result.events[0]["score_before_mines"]
+        if tried >= _settings["candidates"] * 4 or (best and tried >= _settings["candidates"]):
+            break
+    return best
+
+
+def play_game(seed: int) -> Dict:
+    random.seed(seed)
+    game = stamp_players(build_game_setup(), *PLAYERS, "24h")
+    rng = random.Random(seed)
+    engine = GameEngine(rng)
+    summary = {
+        "seed": seed,
+        "first": game["turn_key"],
+        "mines_on_board": dict(Counter(game["internal_mines_on_board"].values())),
+        "rewards_on_board": dict(Counter(game["internal_rewards_on_board"].values())),
+        "moves": 0,
+        "words": 0,
+        "passes": 0,
+        "mines": Counter(),
+        "rewards": Counter(),
+        "transfers": [],
+    }
+    now = game["lastMoveTime"]
+    status = "max_moves"
+    for _ in range(_settings["max_moves"]):
+        username = game["turn"]
+        result = _best_move(engine, game, username, now, rng) or engine.apply(game, username, PASS, now)
+        summary["moves"] += 1
+        for event in result.events:
+            kind = event["type"]
+            if kind == "place_word":
+                summary["words"] += 1
+            elif kind == "pass":
+                summary["passes"] += 1
+            elif kind == "mine_triggered":
+                summary["mines"][event["mine_type"]] += 1
+                if event["mine_type"] == "puan_transferi":
+                    opponent = PLAYERS[1] if username == PLAYERS[0] else PLAYERS[0]
+                    summary["transfers"].append(result.state["scores"][opponent] - game["scores"][opponent])
+            elif kind == "reward_earned":
+                summary["rewards"][event["reward_type"]] += 1
+        game = result.state
+        now += 1
+        if result.finished:
+            status = result.status
+            break
+    summary["status"] = status
+    summary["scores"] = dict(game["scores"])
+    summary["winner"] = game.get("winner") if status != "max_moves" else None
+    summary["mines"] = dict(summary["mines"])
+    summary["rewards"] = dict(summary["rewards"])
+    return summary
+
+
+def _distribution(samples: List[float]) -> Dict:
+    if not samples:
+        return {"mean": None, "p10": None, "p50": None, "p90": None, "max": None}
+    return {
+        "mean": round(mean(samples), 2),
+        "p10": percentile(samples, 10),
+        "p50": percentile(samples, 50),
+        "p90": percentile(samples, 90),
+        "max": max(samples),
+    }
+
+
+def _hit_rates(triggered: Counter, on_board: Counter) -> Dict:
+    return {
+        kind: {"on_board": on_board[kind], "triggered": triggered[kind],
+               "rate": round(triggered[kind] / on_board[kind], 3) if on_board[kind] else None}
+        for kind in sorted(on_board)
+    }
+
+
+def build_report(games: List[Dict], elapsed: float, workers: int) -> Dict:
+    decided = [g for g in games if g["winner"]]
+    winners, losers, margins = [], [], []
+    for g in decided:
+        loser = PLAYERS[1] if g["winner"] == PLAYERS[0] else PLAYERS[0]
+        winners.append(g["scores"][g["winner"]])
+        losers.append(g["scores"][loser])
+        margins.append(g["scores"][g["winner"]] - g["scores"][loser])
+    mines_on_board, mines_triggered = Counter(), Counter()
+    rewards_on_board, rewards_earned = Counter(), Counter()
+    transfers: List[int] = []
+    for g in games:
+        mines_on_board.update(g["mines_on_board"])
+        mines_triggered.update(g["mines"])
+        rewards_on_board.update(g["rewards_on_board"])
+        rewards_earned.update(g["rewards"])
+        transfers.extend(g["transfers"])
+    first_wins = sum(1 for g in decided if g["winner"] == g["first"])
+    return {
+        "games": len(games),
+        "workers": workers,
+        "elapsed_s": round(elapsed, 2),
+        "games_per_s": round(len(games) / elapsed, 1) if elapsed else None,
+        "games_per_s_per_worker": round(len(games) / elapsed / workers, 1) if elapsed else None,
+        "status": dict(Counter(g["status"] for g in games)),
+        "moves": _distribution([g["moves"] for g in games]),
+        "words": _distribution([g["words"] for g in games]),
+        "scores": {
+            "winner": _distribution(winners),
+            "loser": _distribution(losers),
+            "margin": _distribution(margins),
+            "all": _distribution([s for g in games for s in g["scores"].values()]),
+        },
+        "first_player": {
+            "decided": len(decided),
+            "draws": len(games) - len(decided),
+            "win_rate": round(first_wins / len(decided), 3) if decided else None,
+        },
+        "mines": {
+            "rate": round(sum(mines_triggered.values()) / sum(mines_on_board.values()), 3) if mines_on_board else None,
+            "per_game": round(sum(mines_triggered.values()) / len(games), 2) if games else None,
+            "types": _hit_rates(mines_triggered, mines_on_board),
+        },
+        "rewards": {
+            "rate": round(sum(rewards_earned.values()) / sum(rewards_on_board.values()), 3) if rewards_on_board else None,
+            "types": _hit_rates(rewards_earned, rewards_on_board),
+        },
+        "puan_transferi": {"count": len(transfers), "zero": transfers.count(0), **_distribution(transfers)},
+    }
+
+
+def run(args, settings: Dict) -> Dict:
+    seeds = range(args.seed, args.seed + args.games)
+    start = time.perf_counter()
+    if args.workers <= 1:
+        _init_worker(settings)
+        games = [play_game(seed) for seed in seeds]
+    else:
+        # Sözlük fork öncesi bir kez kurulur; worker'lar kopyala-yaz belleğiyle paylaşır.
+        global _vocabulary
+        _vocabulary = Vocabulary(WORD_LIST, settings["max_word_len"], 0, random.Random(0))
+        chunksize = max(1, args.games // (args.workers * 8))
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(settings,)) as pool:
+            games = list(pool.map(play_game, seeds, chunksize=chunksize))
+    return build_report(games, time.perf_counter() - start, max(1, args.workers))
+
+
+def _fmt(row: Dict) -> str:
+    return f"ort {row['mean']}  p10 {row['p10']}  p50 {row['p50']}  p90 {row['p90']}  max {row['max']}"
+
+
+def _print_report(report: Dict):
+    print(f"{report['games']} oyun, {report['workers']} worker, {report['elapsed_s']}s "
+          f"({report['games_per_s']} oyun/s, worker başına {report['games_per_s_per_worker']})")
+    print(f"bitiş: {report['status']}")
+    print(f"{'hamle':<14}{_fmt(report['moves'])}")
+    print(f"{'kelime':<14}{_fmt(report['words'])}")
+    for name, row in report["scores"].items():
+        print(f"{'skor ' + name:<14}{_fmt(row)}")
+    first = report["first_player"]
+    print(f"ilk oyuncu kazanma oranı: {first['win_rate']} ({first['decided']} sonuçlanan, {first['draws']} berabere/yarım)")
+    for label, key in (("mayın", "mines"), ("ödül", "rewards")):
+        print(f"{label} tetiklenme oranı: {report[key]['rate']}")
+        for kind, row in report[key]["types"].items():
+            print(f"  {kind:<22}{row['triggered']:>7}/{row['on_board']:<7} {row['rate']}")
+    transfer = report["puan_transferi"]
+    print(f"puan_transferi: {transfer['count']} kez ({transfer['zero']} sıfır), {_fmt(transfer)}")
+
+
+def _parse_counts(pairs: List[str], known, label: str, parser: argparse.ArgumentParser) -> Dict[str, int]:
+    counts = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if name not in known or not value.isdigit():
+            parser.error(f"{label}: '{pair}' geçersiz; ad=adet bekleniyor ({', '.join(known)})")
+        counts[name] = int(value)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mayın/ödül dengesi için paralel bot-bot öz-oyun")
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1, help="İlk oyunun tohumu; oyun i tohum+i ile oynanır")
+    parser.add_argument("--max-moves", type=int, default=200, help="Bu kadar hamlede bitmeyen oyun yarım sayılır")
+    parser.add_argument("--candidates", type=int, default=5, help="Botun hamle başına karşılaştırdığı geçerli yerleşim")
+    parser.add_argument("--anchor-attempts", type=int, default=40)
+    parser.add_argument("--words-per-anchor", type=int, default=1000, help="Tahtadaki her harf için denenen kelime örneklemi")
+    parser.add_argument("--max-word-len", type=int, default=7)
+    parser.add_argument("--mine", action="append", default=[], help="ör. puan_transferi=2 (tekrarlanabilir)")
+    parser.add_argument("--reward", action="append", default=[], help="ör. harf_yasagi=1 (tekrarlanabilir)")
+    parser.add_argument("--letter", action="append", default=[], help="ör. A=10 (tekrarlanabilir)")
+    parser.add_argument("--json", help="Raporu bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    settings = {
+        "mines": _parse_counts(args.mine, game_utils.MINE_TYPES_COUNT, "--mine", parser),
+        "rewards": _parse_counts(args.reward, game_utils.REWARD_TYPES_COUNT, "--reward", parser),
+        "letters": _parse_counts([l.upper() for l in args.letter], game_utils.LETTER_DISTRIBUTION, "--letter", parser),
+        "max_moves": args.max_moves,
+        "candidates": max(1, args.candidates),
+        "anchor_attempts": args.anchor_attempts,
+        "words_per_anchor": args.words_per_anchor,
+        "max_word_len": args.max_word_len,
+    }
+    report = run(args, settings)
+    report["settings"] = settings
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
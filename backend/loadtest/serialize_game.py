@@ -0,0 +1,186 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.core.game_serializer import serialize_game, dumps
+from app.core.game_setup_pool import build_game_setup, stamp_players
+from app.routers.game_utils import LetterPool
+
+# Şemaya dayalı serialize_game ile eski genel serialize_game_data'yı karşılaştırır:
+# belge başına serileştirme ve hamle başına toplam (serileştirme + yanıt gövdesi) süresi.
+
+logger = logging.getLogger("serialize_bench")
+
+
+# Karşılaştırma için eski uygulamanın birebir kopyası.
+def legacy_serialize_game_data(game_data: dict) -> dict:
+    if not game_data:
+        logger.warning("legacy_serialize_game_data'ya boş veri geldi.")
+        return {}
+
+    def convert_types(item):
+        if isinstance(item, list): return [convert_types(i) for i in item]
+        elif isinstance(item, dict):
+             return {
+                 str(k): convert_types(v) for k, v in item.items()
+                 if not (isinstance(k, str) and k.startswith('internal_'))
+             }
+        elif isinstance(item, ObjectId): return str(item)
+        elif isinstance(item, datetime): return item.isoformat()
+        elif hasattr(item, 'model_dump'):
+             try: return item.model_dump()
+             except AttributeError:
+                  try: return item.dict()
+                  except AttributeError: return item
+        return item
+
+    serialized = {}
+    is_finished = game_data.get("status", "").startswith("finished")
+
+    for key, value in game_data.items():
+        if key == "_id":
+            serialized["game_id"] = str(value)
+        elif key in ["internal_mines_on_board", "internal_rewards_on_board"]:
+            continue
+        elif key == "event_log" and not is_finished:
+            continue
+        else:
+            serialized[key] = convert_types(value)
+
+    serialized.setdefault('player1_username', None)
+    serialized.setdefault('player2_username', None)
+
+    p1_key = game_data.get('player1_key', 'player1')
+    p2_key = game_data.get('player2_key', 'player2')
+
+    scores_from_db = game_data.get("scores", {})
+    serialized['scores'] = {
+        p1_key: scores_from_db.get(p1_key, 0),
+        p2_key: scores_from_db.get(p2_key, 0)
+    }
+
+    p1_user = serialized.get('player1_username')
+    p2_user = serialized.get('player2_username')
+
+    hands_from_db = game_data.get("hands", {})
+    serialized['hands'] = {
+        p1_user: hands_from_db.get(p1_user, []) if p1_user else [],
+        p2_user: hands_from_db.get(p2_user, []) if p2_user else []
+    } if p1_user and p2_user else {}
+
+    rewards_from_db = game_data.get("allAvailableRewards", {})
+    serialized['allAvailableRewards'] = {
+         p1_key: rewards_from_db.get(p1_key, []),
+         p2_key: rewards_from_db.get(p2_key, [])
+    }
+    if 'available_rewards' in serialized:
+        del serialized['available_rewards']
+
+    frozen_from_db = game_data.get("frozen_letters", {})
+    serialized['frozen_letters'] = {
+         p1_user: frozen_from_db.get(p1_user, []) if p1_user else [],
+         p2_user: frozen_from_db.get(p2_user, []) if p2_user else []
+    } if p1_user and p2_user else {}
+
+    letter_pool = LetterPool.load(game_data.get("pool"))
+    serialized['pool'] = letter_pool.to_letters()
+    serialized['pool_remaining'] = letter_pool.remaining
+    serialized.setdefault('status', 'unknown')
+    serialized.setdefault('turn', None)
+    serialized.pop('time_left', None)
+    serialized.setdefault('extra_move_in_progress', False)
+    serialized.setdefault('region_block', None)
+    serialized.setdefault('winner', None)
+    serialized.setdefault('timeOption', '0')
+    serialized.setdefault('lastMoveTime', None)
+    serialized.setdefault('gameStartTime', None)
+    serialized.setdefault('turn_key', None)
+    serialized.setdefault('player1_key', p1_key)
+    serialized.setdefault('player2_key', p2_key)
+
+    board_data = serialized.get('board')
+    if isinstance(board_data, dict) and 'grid' in board_data:
+        pass
+    elif isinstance(board_data, list):
+       serialized['board'] = {'grid': board_data}
+    else:
+        serialized['board'] = {'grid': [[{"letter": None, "special": None, "original_tile": None} for _ in range(15)] for _ in range(15)]}
+        logger.warning(f"Oyun {serialized.get('game_id')} için DB'de geçerli tahta bulunamadı, boş tahta oluşturuldu.")
+
+    if not is_finished:
+        serialized.pop('event_log', None)
+    else:
+         serialized.setdefault('event_log', [])
+
+    return serialized
+
+
+def _sample_game(letters_on_board: int, finished: bool, rng: random.Random) -> dict:
+    game = stamp_players(build_game_setup(), "oyuncu1", "oyuncu2", "5m")
+    game["_id"] = ObjectId()
+    grid = game["board"]["grid"]
+    cells = rng.sample(range(225), letters_on_board)
+    for index in cells:
+        letter = rng.choice("ABCÇDEFGĞHIİJKLMNOÖPRSŞTUÜVYZ")
+        grid[index // 15][index % 15]["letter"] = letter
+        grid[index // 15][index % 15]["original_tile"] = letter
+    game["event_log"] = [{"type": "place_word", "player": "oyuncu1", "timestamp": time.time()} for _ in range(20)]
+    if finished:
+        game["status"] = "finished"
+        game["finishedAt"] = datetime.utcnow()
+    return game
+
+
+def _time(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Oyun belgesi serileştirme ölçümü")
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--letters", type=int, default=40, help="Tahtadaki harf sayısı")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    rng = random.Random(args.seed)
+
+    for finished in (False, True):
+        game = _sample_game(args.letters, finished, rng)
+        legacy, new = legacy_serialize_game_data(game), serialize_game(game)
+        if json.loads(dumps(legacy)) != json.loads(dumps(new)):
+            print("UYARI: çıktılar farklı")
+
+        def legacy_move():
+            # Eski make_move: yayın için bir, yanıt için bir serileştirme; yanıt jsonable_encoder + json.
+            legacy_serialize_game_data(game)
+            body = {"message": "Hamle işlendi.", "game_state": legacy_serialize_game_data(game)}
+            json.dumps(jsonable_encoder(body), ensure_ascii=False).encode()
+
+        def new_move():
+            state = serialize_game(game)
+            dumps({"message": "Hamle işlendi.", "game_state": state})
+
+        label = "bitmiş" if finished else "aktif"
+        doc_old = _time(lambda: legacy_serialize_game_data(game), args.repeat)
+        doc_new = _time(lambda: serialize_game(game), args.repeat)
+        move_old = _time(legacy_move, args.repeat // 4)
+        move_new = _time(new_move, args.repeat // 4)
+        print(f"{label:<7} belge: eski {doc_old * 1e6:7.1f} µs, yeni {doc_new * 1e6:7.1f} µs ({doc_old / doc_new:.1f}x) | "
+              f"hamle: eski {move_old * 1e6:7.1f} µs, yeni {move_new * 1e6:7.1f} µs ({move_old / move_new:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
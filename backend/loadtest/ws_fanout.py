@@ -0,0 +1,138 @@
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.pubsub import BrokerBus, InProcessBus
+from app.core.pubsub_broker import serve
+from app.core.stats import percentile, to_ms
+
+# Bir worker'da yayınlanan oda mesajının diğer worker'lara ulaşma gecikmesini ölçer.
+# Aracı ayrı bir süreçte çalışır; her worker kendi sürecinde BrokerBus ile abone olur.
+
+
+def _run_broker(host: str, port: int, ready):
+    async def main():
+        event = asyncio.Event()
+        task = asyncio.create_task(serve(host, port, event))
+        await event.wait()
+        ready.set()
+        await task
+    asyncio.run(main())
+
+
+async def _subscriber(host: str, port: int, expected: int, ready, results):
+    latencies = []
+    done = asyncio.Event()
+
+    async def on_message(kind, target, text, seq):
+        latencies.append(time.time() - json.loads(text)["sent_at"])
+        if len(latencies) >= expected:
+            done.set()
+
+    bus = BrokerBus(host, port)
+    await bus.start(on_message)
+    ready.set()
+    try:
+        await asyncio.wait_for(done.wait(), timeout=60)
+    except asyncio.TimeoutError:
+        pass
+    await bus.stop()
+    results.put(latencies)
+
+
+def _run_subscriber(*args):
+    asyncio.run(_subscriber(*args))
+
+
+async def _publish(host: str, port: int, messages: int, rate: int, payload_size: int):
+    bus = BrokerBus(host, port)
+    await bus.start(lambda *_: asyncio.sleep(0))
+    filler = "x" * payload_size
+    interval = 1.0 / rate if rate else 0
+    for i in range(messages):
+        text = json.dumps({"type": "game_state_update", "seq": i, "sent_at": time.time(), "payload": filler})
+        await bus.publish("room", f"room{i % 50}", text)
+        if interval:
+            await asyncio.sleep(interval)
+    await bus.stop()
+
+
+async def _inprocess(workers: int, messages: int, payload_size: int):
+    hub = InProcessBus()
+    latencies = []
+
+    async def on_message(kind, target, text, seq):
+        latencies.append(time.time() - json.loads(text)["sent_at"])
+
+    peers = [hub.attach() for _ in range(workers)]
+    for peer in peers:
+        await peer.start(on_message)
+    filler = "x" * payload_size
+    for i in range(messages):
+        text = json.dumps({"type": "game_state_update", "seq": i, "sent_at": time.time(), "payload": filler})
+        await peers[0].publish("room", f"room{i % 50}", text)
+    return latencies
+
+
+def _report(label: str, latencies, elapsed: float = None):
+    line = (f"{label}: n={len(latencies)} p50={to_ms(percentile(latencies, 50))}ms "
+            f"p99={to_ms(percentile(latencies, 99))}ms max={to_ms(max(latencies, default=0))}ms")
+    if elapsed:
+        line += f" ({len(latencies) / elapsed:.0f} teslim/s)"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker'lar arası WebSocket yayın gecikmesi ölçümü")
+    parser.add_argument("--workers", type=int, default=4, help="Abone worker süreç sayısı")
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--rate", type=int, default=1000, help="Saniyede yayın (0: sınırsız)")
+    parser.add_argument("--payload", type=int, default=1500, help="Mesaj başına bayt")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8799)
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    broker_ready = ctx.Event()
+    broker = ctx.Process(target=_run_broker, args=(args.host, args.port, broker_ready), daemon=True)
+    broker.start()
+    broker_ready.wait(10)
+
+    results = ctx.Queue()
+    readies = [ctx.Event() for _ in range(args.workers)]
+    subscribers = [
+        ctx.Process(target=_run_subscriber, args=(args.host, args.port, args.messages, ready, results))
+        for ready in readies
+    ]
+    for proc in subscribers:
+        proc.start()
+    for ready in readies:
+        ready.wait(10)
+
+    start = time.perf_counter()
+    asyncio.run(_publish(args.host, args.port, args.messages, args.rate, args.payload))
+    per_worker = [results.get(timeout=90) for _ in subscribers]
+    elapsed = time.perf_counter() - start
+    for proc in subscribers:
+        proc.join()
+    broker.terminate()
+
+    print(f"worker={args.workers} mesaj={args.messages} hız={args.rate or 'sınırsız'}/s yük={args.payload}B")
+    all_latencies = [l for worker in per_worker for l in worker]
+    for i, latencies in enumerate(per_worker):
+        _report(f"  aracı worker{i}", latencies)
+    _report("aracı toplam", all_latencies, elapsed)
+    lost = args.workers * args.messages - len(all_latencies)
+    if lost:
+        print(f"UYARI: {lost} mesaj teslim edilmedi")
+    _report("süreç içi", asyncio.run(_inprocess(args.workers, args.messages, args.payload)))
+
+
+if __name__ == "__main__":
+    main()
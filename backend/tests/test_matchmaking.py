@@ -0,0 +1,25 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.matchmaking import InMemoryMatchmakingBackend, QueueTicket, MATCHED, QUEUED
+
+
+def test_requeued_pair_in_same_bucket_is_matched_again():
+    # Oyun başlatılamayınca iki oyuncu da kuyruğun önüne geri konur; aynı kovada oldukları için
+    # üçüncü bir oyuncu gelmeden de arka plan taramasında yeniden eşleşmeleri gerekir.
+    async def scenario():
+        backend = InMemoryMatchmakingBackend()
+        assert await backend.enqueue("ali", "5m", 1200.0) == (QUEUED, None)
+        outcome, opponent = await backend.enqueue("veli", "5m", 1210.0)
+        assert outcome == MATCHED and opponent.username == "ali"
+        await backend.requeue(opponent)
+        await backend.requeue(QueueTicket("veli", "5m", 1210.0))
+        pairs = await backend.pair_waiting()
+        return pairs, await backend.stats()
+
+    pairs, stats = asyncio.run(scenario())
+    assert [{a.username, b.username} for a, b in pairs] == [{"ali", "veli"}]
+    assert stats["total_waiting"] == 0